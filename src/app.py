@@ -1,5 +1,7 @@
 from dash import Dash, html, dcc, page_container, callback, Input, Output, State
 import dash_bootstrap_components as dbc
+from pages.modelregistry import MODEL_REGISTRY
+from pages.predictionservice import register_prediction_service
 
 app = Dash(
     __name__,
@@ -8,6 +10,9 @@ app = Dash(
     suppress_callback_exceptions=True
 )
 
+# Micro-batched fine-category predictions for other tools, at /api/fine-prediction
+register_prediction_service(app.server, MODEL_REGISTRY)
+
 def create_nav_buttons(active_path="/"):
     button_styles = {
         'base': {
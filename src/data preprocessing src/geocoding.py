@@ -0,0 +1,233 @@
+"""Geocode Driver City values with a persistent cache.
+
+Results, including places the backend could not find, are stored in SQLite keyed by
+the normalized city and state, so enriching a new extract only queries cities that
+have never been seen before.
+
+    python geocoding.py Maryland_Traffic_Violation_2025.csv Maryland_Traffic_Violation.csv
+    python geocoding.py in.csv out.csv --backend gazetteer --gazetteer us_cities.csv
+"""
+import argparse
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_place(city, state=None):
+    """Return the cache key for a city/state pair, or None for a missing city."""
+    if pd.isna(city) or not str(city).strip():
+        return None
+    city = ' '.join(str(city).upper().split())
+    state = '' if state is None or pd.isna(state) else ' '.join(str(state).upper().split())
+    return f'{city}|{state}'
+
+
+class RateLimiter:
+    """Space out calls from any number of threads to at most `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_call = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class NominatimBackend:
+    """Look places up through the OpenStreetMap Nominatim service."""
+
+    name = 'nominatim'
+
+    def __init__(self, user_agent='my_traffic_app', timeout=10, rate=1.0):
+        from geopy.geocoders import Nominatim
+
+        self.geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+        self.limiter = RateLimiter(rate)
+
+    def geocode(self, city, state):
+        from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+        from requests.exceptions import ConnectTimeout, ReadTimeout
+        from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+        @retry(
+            stop=stop_after_attempt(3),
+            wait=wait_exponential(multiplier=1, min=4, max=10),
+            retry=retry_if_exception_type((GeocoderTimedOut, GeocoderUnavailable, ReadTimeout, ConnectTimeout))
+        )
+        def lookup(search_term):
+            self.limiter.wait()
+            return self.geolocator.geocode(search_term)
+
+        search_term = f'{city}, {state}, USA' if state else f'{city}, USA'
+        location = lookup(search_term)
+        if location:
+            return location.latitude, location.longitude
+        return None, None
+
+
+class GazetteerBackend:
+    """Look places up in a local CSV with city, state, latitude and longitude columns."""
+
+    name = 'gazetteer'
+
+    def __init__(self, path):
+        gazetteer = pd.read_csv(path)
+        gazetteer.columns = [column.strip().lower() for column in gazetteer.columns]
+        keys = [normalize_place(city, state) for city, state in zip(gazetteer['city'], gazetteer['state'])]
+        self.places = {
+            key: (lat, lon)
+            for key, lat, lon in zip(keys, gazetteer['latitude'], gazetteer['longitude'])
+            if key is not None
+        }
+
+        # A city name that occurs in a single state can also be found without the state
+        city_only = {}
+        for key in self.places:
+            city_only.setdefault(key.split('|')[0] + '|', []).append(key)
+        for city_key, matches in city_only.items():
+            if len(matches) == 1:
+                self.places.setdefault(city_key, self.places[matches[0]])
+
+    def geocode(self, city, state):
+        return self.places.get(normalize_place(city, state)) or self.places.get(normalize_place(city)) or (None, None)
+
+
+class GeocodeCache:
+    """SQLite store of geocoding results; a NULL latitude marks a place that was not found."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS places ('
+            'key TEXT PRIMARY KEY, city TEXT, state TEXT, latitude REAL, longitude REAL, '
+            'source TEXT, updated_at REAL)'
+        )
+        self.connection.commit()
+
+    def lookup(self, keys):
+        """Return {key: (lat, lon)} for the keys already in the cache."""
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self.connection.execute(
+                f'SELECT key, latitude, longitude FROM places WHERE key IN ({",".join("?" * len(chunk))})',
+                chunk
+            )
+            for key, lat, lon in rows:
+                found[key] = (lat, lon)
+        return found
+
+    def store(self, results, source):
+        now = time.time()
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO places VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(key, *key.split('|'), lat, lon, source, now) for key, (lat, lon) in results.items()]
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def geocode_places(keys, backend, cache, max_workers=4, retry_missing=False, batch_size=50):
+    """Resolve normalized place keys, querying the backend only for cache misses."""
+    keys = {key for key in keys if key is not None}
+    coords = cache.lookup(keys)
+    if retry_missing:
+        coords = {key: value for key, value in coords.items() if value[0] is not None}
+    pending = sorted(keys - coords.keys())
+    logger.info(f"{len(keys)} unique places, {len(keys) - len(pending)} cached, {len(pending)} to geocode")
+
+    def resolve(key):
+        city, state = key.split('|')
+        try:
+            return backend.geocode(city, state)
+        except Exception as e:
+            logger.warning(f"Geocoding failed for {city}, {state}: {str(e)}")
+            return None
+
+    batch = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(resolve, key): key for key in pending}
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            # Errors are not cached so the place is tried again on the next run
+            if result is not None:
+                batch[futures[future]] = result
+                coords[futures[future]] = result
+            if len(batch) >= batch_size:
+                cache.store(batch, backend.name)
+                batch = {}
+            if i % 10 == 0:
+                logger.info(f"Processed {i}/{len(pending)} places ({(i / len(pending) * 100):.1f}%)")
+    if batch:
+        cache.store(batch, backend.name)
+    return coords
+
+
+def add_city_coordinates(df, backend, cache_path='city_coordinates_cache.sqlite', city_col='Driver City',
+                         state_col='Driver State', max_workers=4, retry_missing=False):
+    """Add Driver_City_Latitude and Driver_City_Longitude columns to df."""
+    states = df[state_col] if state_col in df.columns else pd.Series(None, index=df.index)
+    keys = pd.Series([normalize_place(city, state) for city, state in zip(df[city_col], states)], index=df.index)
+
+    cache = GeocodeCache(cache_path)
+    try:
+        coords = geocode_places(keys, backend, cache, max_workers=max_workers, retry_missing=retry_missing)
+    finally:
+        cache.close()
+
+    df['Driver_City_Latitude'] = keys.map(lambda key: coords.get(key, (None, None))[0]).astype(float)
+    df['Driver_City_Longitude'] = keys.map(lambda key: coords.get(key, (None, None))[1]).astype(float)
+
+    total_records = int(keys.notna().sum())
+    records_with_coords = int(df['Driver_City_Latitude'].notna().sum())
+    logger.info("Geocoding Summary:")
+    logger.info(f"Records with a city: {total_records}")
+    logger.info(f"Records with coordinates: {records_with_coords}")
+    if total_records:
+        logger.info(f"Success rate: {(records_with_coords / total_records * 100):.1f}%")
+    return df
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Add Driver City coordinates to a violations CSV.')
+    parser.add_argument('input', help='CSV file with a Driver City column')
+    parser.add_argument('output', help='CSV file to write')
+    parser.add_argument('--cache', default='city_coordinates_cache.sqlite', help='SQLite geocoding cache')
+    parser.add_argument('--backend', choices=['nominatim', 'gazetteer'], default='nominatim')
+    parser.add_argument('--gazetteer', help='CSV with city, state, latitude, longitude columns')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent lookups')
+    parser.add_argument('--rate', type=float, default=1.0, help='maximum Nominatim requests per second')
+    parser.add_argument('--user-agent', default='my_traffic_app')
+    parser.add_argument('--retry-missing', action='store_true', help='query places cached as not found again')
+    args = parser.parse_args()
+
+    if args.backend == 'gazetteer':
+        if not args.gazetteer:
+            parser.error('--gazetteer is required with --backend gazetteer')
+        backend = GazetteerBackend(args.gazetteer)
+    else:
+        backend = NominatimBackend(user_agent=args.user_agent, rate=args.rate)
+
+    df = pd.read_csv(args.input)
+    df = add_city_coordinates(df, backend, args.cache, max_workers=args.workers, retry_missing=args.retry_missing)
+    df.to_csv(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
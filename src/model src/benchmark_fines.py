@@ -0,0 +1,220 @@
+"""Benchmark fine-category inference and gate it against a stored baseline.
+
+Measures single-row latency of the price page's scoring and explanation path,
+with the explanation also timed on its own, batch throughput and peak traced
+memory at batch sizes from 1 to 100k, the cold-load time of the artifact in a
+fresh process with imports excluded, and the artifact size. Rows are sampled
+from the 2025 extract. The report is written as JSON; with --baseline the run
+fails if any metric is worse than the baseline by more than the tolerance factor.
+
+    python benchmark_fines.py --output benchmark.json --save-baseline benchmark_baseline.json
+    python benchmark_fines.py --baseline benchmark_baseline.json --tolerance 1.5
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pages.featurepipeline import REQUIRED_FIELDS
+from pages.fineprediction import explain_fine_categories, predict_fine_categories
+from pages.modelregistry import MODEL_PATH, ModelRegistry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATA_PATH = 'Maryland_Traffic_Violation_2025.csv'
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+
+# Metric path -> whether larger values are better
+GATED_METRICS = {
+    'single_row_ms.p50': False,
+    'single_row_ms.p95': False,
+    'single_row_ms.p99': False,
+    'single_row_ms.explain_p50': False,
+    'single_row_ms.explain_p95': False,
+    'single_row_ms.explain_p99': False,
+    'cold_load_s': False,
+    'artifact_mb': False,
+    **{f'batch.{size}.rows_per_s': True for size in BATCH_SIZES},
+    **{f'batch.{size}.peak_mb': False for size in BATCH_SIZES}
+}
+
+
+def sample_rows(path, n, seed=0):
+    """Rows with the model input columns, sampled with replacement from the extract."""
+    df = pd.read_csv(path, usecols=REQUIRED_FIELDS)
+    return df.sample(n, replace=True, random_state=seed).reset_index(drop=True)
+
+
+def score_like_price_page(record, model_dict):
+    """Predict one violation and explain its category as price.predict_fine_category does.
+
+    Returns the seconds spent in the explanation, None if the forest cannot be explained.
+    """
+    frame = pd.DataFrame([record])
+    predictions, _ = predict_fine_categories(frame, model_dict)
+    start = time.perf_counter()
+    try:
+        explain_fine_categories(frame, model_dict, [predictions['predicted_category'].iloc[0]])
+    except ValueError:
+        return None
+    return time.perf_counter() - start
+
+
+def single_row_latency(model_dict, rows, repeats):
+    """Latency percentiles, in ms, of scoring one violation the way the price page does.
+
+    The totals include the explanation the page shows; its own share is reported as
+    the explain_ percentiles.
+    """
+    records = rows.head(repeats).to_dict('records')
+    score_like_price_page(records[0], model_dict)
+    timings, explain_timings = [], []
+    for record in records:
+        start = time.perf_counter()
+        explain_seconds = score_like_price_page(record, model_dict)
+        timings.append((time.perf_counter() - start) * 1000)
+        if explain_seconds is not None:
+            explain_timings.append(explain_seconds * 1000)
+    p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+    latency = {'p50': p50, 'p95': p95, 'p99': p99, 'samples': len(timings)}
+    if explain_timings:
+        p50, p95, p99 = np.percentile(explain_timings, [50, 95, 99])
+        latency.update({'explain_p50': p50, 'explain_p95': p95, 'explain_p99': p99})
+    return latency
+
+
+def batch_throughput(model_dict, rows, sizes):
+    """Rows per second and peak traced memory for each batch size.
+
+    tracemalloc slows every allocation down, so throughput is timed in an untraced
+    pass and the peak is taken from a separate traced call.
+    """
+    results = {}
+    for size in sizes:
+        batch = rows.head(size)
+        repeats = max(1, min(20, 10000 // size))
+        start = time.perf_counter()
+        for _ in range(repeats):
+            predict_fine_categories(batch, model_dict)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        predict_fine_categories(batch, model_dict)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[str(size)] = {'rows_per_s': size * repeats / elapsed, 'peak_mb': peak / 2 ** 20}
+        logger.info(f"Batch {size}: {results[str(size)]['rows_per_s']:.0f} rows/s, {results[str(size)]['peak_mb']:.1f} MB peak")
+    return results
+
+
+def cold_load_time(model_path, repeats=3):
+    """Median seconds to load the artifact in a fresh interpreter, imports excluded.
+
+    Unpickling imports sklearn, scipy and the pages modules the first time, so the
+    child loads the artifact once untimed and times a second load.
+    """
+    script = (
+        'import sys, time, joblib; sys.path.append(sys.argv[2]); '
+        'joblib.load(sys.argv[1], mmap_mode="r"); '
+        'start = time.perf_counter(); joblib.load(sys.argv[1], mmap_mode="r"); '
+        'print(time.perf_counter() - start)'
+    )
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    timings = [
+        float(subprocess.run([sys.executable, '-c', script, model_path, src_dir],
+                             capture_output=True, text=True, check=True).stdout.strip())
+        for _ in range(repeats)
+    ]
+    return float(np.median(timings))
+
+
+def run_benchmark(model_path=MODEL_PATH, data_path=DATA_PATH, sizes=BATCH_SIZES, latency_samples=500):
+    rows = sample_rows(data_path, max(max(sizes), latency_samples))
+    model_dict = ModelRegistry(model_path).get()
+    predict_fine_categories(rows.head(100), model_dict)
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'sklearn': sklearn.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        },
+        'artifact_mb': os.path.getsize(model_path) / 2 ** 20,
+        'cold_load_s': cold_load_time(model_path),
+        'single_row_ms': single_row_latency(model_dict, rows, latency_samples),
+        'batch': batch_throughput(model_dict, rows, sizes)
+    }
+    return report
+
+
+def metric(report, path):
+    value = report
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def regressions(report, baseline, tolerance):
+    """Describe every gated metric that is worse than the baseline by more than tolerance."""
+    failures = []
+    for path, higher_is_better in GATED_METRICS.items():
+        current, reference = metric(report, path), metric(baseline, path)
+        if current is None or reference is None or reference <= 0:
+            continue
+        ratio = reference / current if higher_is_better else current / reference
+        if ratio > tolerance:
+            failures.append(f"{path}: {current:.4g} vs baseline {reference:.4g} ({ratio:.2f}x worse)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark fine-category inference.')
+    parser.add_argument('--model', default=MODEL_PATH, help='model artifact')
+    parser.add_argument('--data', default=DATA_PATH, help='CSV to sample rows from')
+    parser.add_argument('--output', default='benchmark.json', help='JSON report to write')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed slowdown factor per metric')
+    parser.add_argument('--save-baseline', help='also write the report to this baseline path')
+    parser.add_argument('--max-batch', type=int, default=max(BATCH_SIZES), help='largest batch size to run')
+    args = parser.parse_args()
+
+    sizes = [size for size in BATCH_SIZES if size <= args.max_batch]
+    report = run_benchmark(args.model, args.data, sizes)
+    for path in [args.output, args.save_baseline]:
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+    latency = report['single_row_ms']
+    logger.info(f"Single row: p50 {latency['p50']:.2f} ms, p95 {latency['p95']:.2f} ms, p99 {latency['p99']:.2f} ms")
+    if 'explain_p50' in latency:
+        logger.info(f"  of which explanation: p50 {latency['explain_p50']:.2f} ms, p95 {latency['explain_p95']:.2f} ms")
+    logger.info(f"Cold load {report['cold_load_s']:.2f}s, artifact {report['artifact_mb']:.1f} MB")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = regressions(report, baseline, args.tolerance)
+        for failure in failures:
+            logger.error(f"Regression: {failure}")
+        if failures:
+            sys.exit(1)
+        logger.info(f"No metric regressed by more than {args.tolerance}x")
+
+
+if __name__ == '__main__':
+    main()
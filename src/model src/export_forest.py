@@ -0,0 +1,95 @@
+"""Export the artifact's random forest to the compact array format used for serving.
+
+The compact forest is stored under 'compact_forest' next to the sklearn model, or
+instead of it with --drop-sklearn, which leaves an artifact whose forest is plain
+arrays that the model registry can memory-map. Pruning (--max-trees, --max-depth)
+and leaf quantization (--leaf-dtype) shrink it further; the report compares its
+predictions and accuracy with the sklearn forest on a sample extract. Internal
+node class values are stored too, so predictions can be explained.
+
+    python export_forest.py fine_prediction_model.joblib fine_prediction_model.joblib --drop-sklearn
+    python export_forest.py fine_prediction_model.joblib small.joblib --max-trees 300 --leaf-dtype uint8
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+
+import joblib
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pages.compactforest import LEAF_DTYPES, CompactForest
+from pages.fineprediction import feature_pipeline, raw_space_model
+from pages.modelregistry import save_artifact
+from train_fines import load_training_data
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def pickled_size(obj):
+    buffer = io.BytesIO()
+    joblib.dump(obj, buffer)
+    return buffer.tell()
+
+
+def compare_forests(model_dict, forest, data_path, sample_size=20000):
+    """Agreement, probability difference and accuracy of the compact forest against sklearn."""
+    df = load_training_data(data_path)
+    df = df.sample(min(sample_size, len(df)), random_state=0)
+    X = feature_pipeline(model_dict).transform(df)
+    reference = raw_space_model(model_dict).predict_proba(X)
+    compact = forest.predict_proba(X)
+    classes = model_dict['classes']
+    target = (df['Fine'] // 10).to_numpy()
+    reference_accuracy = float((classes[reference.argmax(axis=1)] == target).mean())
+    compact_accuracy = float((classes[compact.argmax(axis=1)] == target).mean())
+    return {
+        'rows': len(df),
+        'agreement': float((reference.argmax(axis=1) == compact.argmax(axis=1)).mean()),
+        'max_probability_delta': float(np.abs(reference - compact).max()),
+        'accuracy': compact_accuracy,
+        'accuracy_delta': compact_accuracy - reference_accuracy
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the fine model forest to compact arrays.')
+    parser.add_argument('input', help='model artifact with a sklearn forest')
+    parser.add_argument('output', help='artifact to write')
+    parser.add_argument('--max-trees', type=int, help='keep only the first N trees')
+    parser.add_argument('--max-depth', type=int, help='collapse subtrees below this depth into leaves')
+    parser.add_argument('--leaf-dtype', choices=list(LEAF_DTYPES), default='float64')
+    parser.add_argument('--drop-sklearn', action='store_true', help='leave the sklearn forest out of the output')
+    parser.add_argument('--data', default='Maryland_Traffic_Violation_2025.csv', help='extract used for the comparison')
+    args = parser.parse_args()
+
+    model_dict = joblib.load(args.input)
+    forest = CompactForest.from_sklearn(
+        model_dict['model'], model_dict['scaler'],
+        max_trees=args.max_trees, max_depth=args.max_depth, leaf_dtype=args.leaf_dtype
+    )
+    logger.info(
+        f"{forest.n_trees} trees, depth {forest.max_depth}: {forest.nbytes / 2 ** 20:.1f} MB of arrays, "
+        f"sklearn forest pickles to {pickled_size(model_dict['model']) / 2 ** 20:.1f} MB"
+    )
+    if os.path.exists(args.data):
+        comparison = compare_forests(model_dict, forest, args.data)
+        logger.info(
+            f"On {comparison['rows']} rows: {comparison['agreement']:.2%} same category, "
+            f"max probability delta {comparison['max_probability_delta']:.2e}, "
+            f"accuracy {comparison['accuracy']:.3f} ({comparison['accuracy_delta']:+.3f})"
+        )
+        model_dict['compact_forest_comparison'] = comparison
+
+    model_dict['compact_forest'] = forest
+    if args.drop_sklearn:
+        del model_dict['model']
+    save_artifact(model_dict, args.output)
+    logger.info(f"Saved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Load-test the micro-batched prediction endpoint in process.
+
+Starts the endpoint on a bare Flask app with the given batching settings, then
+posts single violation records from many client threads through the Flask test
+client and reports throughput, latency percentiles and the batch sizes the
+service formed. --unbatched scores every request on its own for comparison.
+
+    python loadtest_predictions.py --concurrency 32 --requests 5000
+    python loadtest_predictions.py --max-batch-size 128 --max-wait-ms 20
+    python loadtest_predictions.py --unbatched
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from flask import Flask
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from benchmark_fines import DATA_PATH, sample_rows
+from pages.modelregistry import MODEL_PATH, ModelRegistry
+from pages.predictionservice import (
+    MAX_BATCH_SIZE, MAX_WAIT_MS, PREDICTION_ROUTE,
+    MicroBatcher, batch_predictor, register_prediction_service
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def json_records(rows):
+    """Rows as JSON-ready dicts, missing values as null the way other tools send them."""
+    return rows.astype(object).where(rows.notna(), None).to_dict('records')
+
+
+def run_load(server, records, concurrency, route=PREDICTION_ROUTE):
+    """Post every record from concurrency threads; return per-request latencies in ms and seconds taken."""
+    def worker(chunk):
+        client = server.test_client()
+        latencies = []
+        for record in chunk:
+            start = time.perf_counter()
+            response = client.post(route, json=record)
+            if response.status_code != 200:
+                raise RuntimeError(f"{response.status_code}: {response.get_json()}")
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    chunks = [records[i::concurrency] for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = [latency for result in executor.map(worker, chunks) for latency in result]
+    return np.array(latencies), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the micro-batched prediction endpoint.')
+    parser.add_argument('--model', default=MODEL_PATH, help='model artifact')
+    parser.add_argument('--data', default=DATA_PATH, help='CSV to sample records from')
+    parser.add_argument('--requests', type=int, default=2000, help='single-record requests to send')
+    parser.add_argument('--concurrency', type=int, default=32, help='client threads')
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--unbatched', action='store_true', help='score each request on its own')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.model)
+    registry.get()
+    max_batch_size, max_wait_ms = (1, 0) if args.unbatched else (args.max_batch_size, args.max_wait_ms)
+    batcher = MicroBatcher(batch_predictor(registry), max_batch_size, max_wait_ms)
+    server = Flask(__name__)
+    register_prediction_service(server, registry, batcher)
+
+    records = json_records(sample_rows(args.data, args.requests))
+    run_load(server, records[:args.concurrency], args.concurrency)
+    latencies, seconds = run_load(server, records, args.concurrency)
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    stats = batcher.stats()
+    logger.info(
+        f"{len(latencies)} requests from {args.concurrency} threads in {seconds:.2f}s "
+        f"({len(latencies) / seconds:.0f} requests/s)"
+    )
+    logger.info(f"Latency p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms")
+    logger.info(f"Mean batch size {stats['mean_batch_size']:.1f} over {stats['batches']} batches, {stats['failures']} failures")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Score violation extracts with the fine-category model.
+
+The input is read in chunks and the chunks are scored by a pool of worker
+processes, each of which loads the model artifact once. Predictions are written
+to Parquet in input order, one row per input row.
+
+    python score_fines.py Maryland_Traffic_Violation.csv predictions.parquet
+    python score_fines.py history.parquet predictions.parquet --workers 8 --chunk-size 100000
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pages.featurepipeline import REQUIRED_FIELDS
+from pages.fineprediction import predict_fine_categories
+from pages.modelregistry import MODEL_PATH, ModelRegistry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Set in every worker process by load_worker_model
+_model_dict = None
+
+
+def read_chunks(path, chunk_size, id_column=None):
+    """Yield DataFrames of at most chunk_size rows with the columns the model needs."""
+    columns = REQUIRED_FIELDS + ([id_column] if id_column else [])
+    if path.endswith('.parquet'):
+        parquet_file = pq.ParquetFile(path)
+        available = set(parquet_file.schema_arrow.names)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=[c for c in columns if c in available]):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=lambda column: column in columns, chunksize=chunk_size)
+
+
+def load_worker_model(model_path):
+    global _model_dict
+    _model_dict = ModelRegistry(model_path).get()
+
+
+def probability_column(category):
+    return f'prob_{category:g}' if isinstance(category, (int, float)) else f'prob_{category}'
+
+
+def score_chunk(chunk, id_column=None):
+    """Predicted category, confidence and class probabilities for one chunk."""
+    predictions, probabilities = predict_fine_categories(chunk, _model_dict)
+    scored = pd.DataFrame(index=chunk.index)
+    if id_column and id_column in chunk.columns:
+        scored[id_column] = chunk[id_column].astype('string')
+    scored['predicted_category'] = predictions['predicted_category'].astype(float)
+    scored['confidence'] = predictions['confidence'].astype(float)
+    for category in probabilities.columns:
+        scored[probability_column(category)] = probabilities[category].astype(float)
+    return scored
+
+
+def score_file(input_path, output_path, model_path=MODEL_PATH, chunk_size=50000, workers=None, id_column='SeqID'):
+    """Score input_path into a Parquet file and return (rows, seconds)."""
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+    rows = 0
+    writer = None
+    pending = []
+
+    def write(scored):
+        nonlocal writer, rows
+        table = pa.Table.from_pandas(scored, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(output_path, table.schema)
+        writer.write_table(table.cast(writer.schema))
+        rows += len(scored)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Scored {rows} rows ({rows / elapsed:.0f} rows/s)")
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=load_worker_model, initargs=(model_path,)) as executor:
+            # A bounded number of chunks in flight keeps memory flat on large inputs
+            for chunk in read_chunks(input_path, chunk_size, id_column):
+                pending.append(executor.submit(score_chunk, chunk, id_column))
+                if len(pending) >= 2 * workers:
+                    write(pending.pop(0).result())
+            for future in pending:
+                write(future.result())
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a violations extract with the fine-category model.')
+    parser.add_argument('input', help='CSV or Parquet file with the model input columns')
+    parser.add_argument('output', help='Parquet file to write')
+    parser.add_argument('--model', default=MODEL_PATH, help='model artifact')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='rows per chunk')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='scoring processes')
+    parser.add_argument('--id-column', default='SeqID', help='input column copied to the output, if present')
+    args = parser.parse_args()
+
+    rows, seconds = score_file(args.input, args.output, args.model, args.chunk_size, args.workers, args.id_column)
+    logger.info(f"Scored {rows} rows in {seconds:.1f}s ({rows / max(seconds, 1e-9):.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Train the fine-category random forest from a violations extract.
+
+The fitted feature transformer, feature matrix and target are cached on disk,
+keyed by the input file and the feature-pipeline version, so repeated runs on the
+same data only refit the forest. Training, cross-validation and the optional
+hyperparameter search use all cores. The artifact has the model_dict layout the
+price page loads.
+
+    python train_fines.py Maryland_Traffic_Violation.csv
+    python train_fines.py Maryland_Traffic_Violation.csv --cv 5 --search --output fine_prediction_model.joblib
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import classification_report
+from sklearn.model_selection import KFold, RandomizedSearchCV, cross_val_score, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pages.compactforest import CompactForest
+from pages.datacache import cached
+from pages.featurepipeline import BOOLEAN_COLUMNS, FEATURE_PIPELINE_VERSION, REQUIRED_FIELDS, FineFeatureTransformer
+from pages.modelregistry import MODEL_PATH, save_artifact
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# The settings the notebook model was trained with
+FOREST_PARAMS = {
+    'n_estimators': 1500,
+    'max_depth': 550,
+    'min_samples_split': 50,
+    'min_samples_leaf': 20,
+    'class_weight': 'balanced',
+    'random_state': 30
+}
+
+SEARCH_SPACE = {
+    'n_estimators': [300, 600, 1000, 1500],
+    'max_depth': [20, 50, 100, None],
+    'min_samples_split': [10, 25, 50, 100],
+    'min_samples_leaf': [5, 10, 20, 40],
+    'max_features': ['sqrt', 'log2', 0.3]
+}
+
+
+def clean_fines(values):
+    """Vectorized clean_fine: strip '$', 'MA' and commas, with missing or 'MA' as 0."""
+    text = values.astype(str).str.replace('$', '', regex=False).str.replace('MA', '', regex=False)
+    numbers = pd.to_numeric(text.str.replace(',', '', regex=False).str.strip().replace('', '0'), errors='coerce')
+    return numbers.where(values.notna() & (values != 'MA'), 0).fillna(0).astype(float)
+
+
+def load_training_data(path):
+    """Model input columns and the Fine column of a CSV or Parquet extract."""
+    columns = REQUIRED_FIELDS + ['Fine']
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+    df['Fine'] = clean_fines(df['Fine'])
+    return df
+
+
+def feature_set(data_path, max_features=250, n_clusters=5):
+    """(fitted transformer, CSR features, target), cached per input file and pipeline version."""
+    def build():
+        logger.info(f"Building features from {data_path}")
+        df = load_training_data(data_path)
+        pipeline = FineFeatureTransformer(max_features=max_features, n_clusters=n_clusters, random_state=42)
+        X = pipeline.fit_transform(df)
+        return pipeline, X, (df['Fine'] // 10).to_numpy()
+
+    return cached(f'fine-features-{max_features}-{n_clusters}', data_path, build, version=FEATURE_PIPELINE_VERSION)
+
+
+def train_model(data_path, cv=0, search=False, search_iterations=20, n_jobs=-1, max_features=250, n_clusters=5):
+    """Fit the forest and return a model_dict in the artifact layout."""
+    pipeline, X, y = feature_set(data_path, max_features, n_clusters)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=30)
+
+    params = dict(FOREST_PARAMS)
+    search_results = None
+    if search:
+        # Parallelize across candidates and folds rather than within each forest
+        search_cv = RandomizedSearchCV(
+            RandomForestClassifier(class_weight='balanced', random_state=30, n_jobs=1),
+            SEARCH_SPACE,
+            n_iter=search_iterations,
+            scoring='f1_macro',
+            cv=KFold(n_splits=max(cv, 3), shuffle=True, random_state=30),
+            n_jobs=n_jobs,
+            random_state=30
+        )
+        search_cv.fit(X_train, y_train)
+        params.update(search_cv.best_params_)
+        search_results = {'best_params': search_cv.best_params_, 'best_score': search_cv.best_score_}
+        logger.info(f"Best parameters {search_cv.best_params_} (f1_macro {search_cv.best_score_:.3f})")
+
+    model = RandomForestClassifier(**params, n_jobs=n_jobs)
+
+    cv_scores = None
+    if cv > 1:
+        cv_scores = cross_val_score(
+            model, X_train, y_train, scoring='f1_macro',
+            cv=KFold(n_splits=cv, shuffle=True, random_state=30), n_jobs=1
+        )
+        logger.info(f"Cross-validated f1_macro {cv_scores.mean():.3f} +/- {cv_scores.std():.3f}")
+
+    model.fit(X_train, y_train)
+    performance = classification_report(y_test, model.predict(X_test), output_dict=True, zero_division=0)
+    logger.info(f"Test accuracy {performance['accuracy']:.3f}, macro f1 {performance['macro avg']['f1-score']:.3f}")
+
+    # Trees do not depend on feature scale, so the forest is fit on the sparse raw
+    # features and the stored scaler is the identity
+    scaler = StandardScaler(with_mean=False, with_std=False).fit(X_train)
+
+    return {
+        'model': model,
+        # Scores and explains predictions without a second sklearn forest at serving time
+        'compact_forest': CompactForest.from_sklearn(model, scaler),
+        'feature_pipeline': pipeline,
+        'label_encoders': pipeline.label_encoders_,
+        'tfidf': pipeline.tfidf_,
+        'scaler': scaler,
+        'location_model': pipeline.location_model_,
+        'boolean_columns': BOOLEAN_COLUMNS,
+        'trained_date': datetime.now(),
+        'classes': model.classes_,
+        'performance': performance,
+        'params': params,
+        'cv_scores': None if cv_scores is None else np.asarray(cv_scores),
+        'search': search_results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the fine-category model.')
+    parser.add_argument('input', help='CSV or Parquet violations extract')
+    parser.add_argument('--output', default=MODEL_PATH, help='model artifact to write')
+    parser.add_argument('--cv', type=int, default=0, help='cross-validation folds to report, 0 to skip')
+    parser.add_argument('--search', action='store_true', help='run a randomized hyperparameter search first')
+    parser.add_argument('--search-iterations', type=int, default=20)
+    parser.add_argument('--n-jobs', type=int, default=-1, help='parallel jobs, -1 for all cores')
+    args = parser.parse_args()
+
+    model_dict = train_model(args.input, args.cv, args.search, args.search_iterations, args.n_jobs)
+    save_artifact(model_dict, args.output)
+    logger.info(f"Saved {args.output}")
+
+
+if __name__ == '__main__':
+    main()
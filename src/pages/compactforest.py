@@ -0,0 +1,264 @@
+import numpy as np
+import scipy.sparse as sp
+
+
+# Leaf value storage types and the factor stored values are divided by
+LEAF_DTYPES = {
+    'float64': 1.0,
+    'float32': 1.0,
+    'float16': 1.0,
+    'uint16': 65535.0,
+    'uint8': 255.0
+}
+
+# Row-tree pairs traversed together; bounds the evaluator's working memory
+PAIRS_PER_CHUNK = 500_000
+
+
+def raw_thresholds(thresholds, scale, mean):
+    """Largest float32 raw value per split that still passes the scaled test.
+
+    Trees compare float32 input against float64 thresholds, and a threshold can sit
+    exactly on a training value, so t * scale + mean is snapped to the float32 grid
+    the way scaler.transform would have rounded it.
+    """
+    def passes(raw):
+        return ((raw.astype(float) - mean) / scale).astype(np.float32) <= thresholds
+
+    raw = (thresholds * scale + mean).astype(np.float32)
+    for _ in range(8):
+        up = np.nextafter(raw, np.float32(np.inf))
+        step_up = passes(up)
+        step_down = ~passes(raw)
+        if not (step_up.any() or step_down.any()):
+            break
+        raw = np.where(step_up, up, np.where(step_down, np.nextafter(raw, np.float32(-np.inf)), raw))
+    return raw.astype(float)
+
+
+def scaler_terms(scaler, n_features):
+    """(scale, mean) of a StandardScaler, as ones and zeros where it does not scale or centre."""
+    scale = getattr(scaler, 'scale_', None)
+    mean = getattr(scaler, 'mean_', None)
+    return (
+        np.ones(n_features) if scale is None else np.asarray(scale, dtype=float),
+        np.zeros(n_features) if mean is None else np.asarray(mean, dtype=float)
+    )
+
+
+def node_depths(left, right, is_leaf, max_depth=None):
+    """Depth of every node reachable from the root, -1 below leaves or the depth limit."""
+    depth = np.full(len(left), -1)
+    frontier = np.array([0])
+    level = 0
+    while frontier.size:
+        depth[frontier] = level
+        if max_depth is not None and level >= max_depth:
+            break
+        internal = frontier[~is_leaf[frontier]]
+        frontier = np.concatenate([left[internal], right[internal]])
+        level += 1
+    return depth
+
+
+class CompactForest:
+    """A random forest flattened into contiguous arrays and scored without sklearn.
+
+    Internal nodes hold a feature, a float32 threshold in unscaled feature space and
+    a (left, right) row of child pointers; a negative pointer ~i refers to row i of
+    the leaf value table, which holds class fractions. node_values holds the class
+    fractions of the internal nodes, which only explanations need. All arrays are
+    plain ndarrays, so a joblib artifact holding the forest can be memory-mapped
+    and shared between workers.
+    """
+
+    def __init__(self, feature, threshold, children, roots, leaf_values, classes, value_scale=1.0, max_depth=0,
+                 node_values=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.roots = roots
+        self.leaf_values = leaf_values
+        self.classes_ = classes
+        self.value_scale = value_scale
+        self.max_depth = max_depth
+        self.node_values = node_values
+
+    def __setstate__(self, state):
+        # Forests exported before node values were stored
+        self.__dict__.update({'node_values': None, **state})
+
+    @classmethod
+    def from_sklearn(cls, model, scaler=None, max_trees=None, max_depth=None, leaf_dtype='float64'):
+        """Export a fitted forest classifier.
+
+        scaler is the StandardScaler the forest was trained behind; it is folded into
+        the thresholds so the forest takes unscaled input. max_trees keeps only the
+        first trees and max_depth turns deeper subtrees into leaves holding their
+        node's class mix. leaf_dtype trades leaf value precision for size.
+        """
+        estimators = model.estimators_[:max_trees]
+        scale, mean = scaler_terms(scaler, model.n_features_in_)
+        features, thresholds, children, roots, values, node_values = [], [], [], [], [], []
+        internal_offset = leaf_offset = 0
+        depth_reached = 0
+
+        for estimator in estimators:
+            tree = estimator.tree_
+            is_leaf = tree.children_left < 0
+            depth = node_depths(tree.children_left, tree.children_right, is_leaf, max_depth)
+            reachable = depth >= 0
+            leaf = reachable & (is_leaf | (depth == max_depth if max_depth is not None else False))
+            internal = reachable & ~leaf
+            depth_reached = max(depth_reached, int(depth.max()))
+
+            internal_ids = np.cumsum(internal) - 1 + internal_offset
+            leaf_ids = np.cumsum(leaf) - 1 + leaf_offset
+            pointer = np.where(internal, internal_ids, ~leaf_ids).astype(np.int32)
+
+            nodes = np.nonzero(internal)[0]
+            node_features = tree.feature[nodes]
+            features.append(node_features.astype(np.int32))
+            thresholds.append(raw_thresholds(tree.threshold[nodes], scale[node_features], mean[node_features]).astype(np.float32))
+            children.append(np.column_stack([pointer[tree.children_left[nodes]], pointer[tree.children_right[nodes]]]))
+            roots.append(pointer[0])
+
+            leaf_value = tree.value[leaf, 0, :]
+            values.append(leaf_value / leaf_value.sum(axis=1, keepdims=True))
+            node_value = tree.value[nodes, 0, :]
+            node_values.append(node_value / node_value.sum(axis=1, keepdims=True))
+            internal_offset += len(nodes)
+            leaf_offset += int(leaf.sum())
+
+        value_scale = LEAF_DTYPES[leaf_dtype]
+        leaf_values = np.concatenate(values)
+        internal_values = np.concatenate(node_values)
+        if value_scale != 1.0:
+            leaf_values = np.round(leaf_values * value_scale)
+            internal_values = np.round(internal_values * value_scale)
+        return cls(
+            np.concatenate(features),
+            np.concatenate(thresholds),
+            np.ascontiguousarray(np.concatenate(children)),
+            np.array(roots, dtype=np.int32),
+            np.ascontiguousarray(leaf_values.astype(leaf_dtype)),
+            np.asarray(model.classes_),
+            value_scale,
+            depth_reached,
+            np.ascontiguousarray(internal_values.astype(leaf_dtype))
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        arrays = [self.feature, self.threshold, self.children, self.roots, self.leaf_values, self.node_values]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def _dense(self, X):
+        X = X.toarray() if sp.issparse(X) else np.asarray(X)
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def apply(self, X):
+        """Leaf row reached in every tree, as an (n_samples, n_trees) array."""
+        X = self._dense(X)
+        n_trees = self.n_trees
+        index_type = np.int32 if X.size < 2 ** 31 else np.int64
+        # Offset of each pair's row in the flattened input
+        row_offsets = np.repeat(np.arange(len(X), dtype=index_type) * X.shape[1], n_trees)
+        values = X.ravel()
+        children = self.children.ravel()
+        nodes = np.tile(self.roots, len(X))
+        active = np.flatnonzero(nodes >= 0)
+        while active.size:
+            current = nodes[active]
+            go_right = values[row_offsets[active] + self.feature[current]] > self.threshold[current]
+            nodes[active] = children[2 * current + go_right]
+            active = active[nodes[active] >= 0]
+        return (~nodes).reshape(len(X), n_trees)
+
+    def predict_proba(self, X):
+        """Average leaf class fractions over all trees, computed in row chunks."""
+        chunk_rows = max(1, PAIRS_PER_CHUNK // self.n_trees)
+        results = []
+        for start in range(0, X.shape[0], chunk_rows):
+            leaves = self.apply(X[start:start + chunk_rows])
+            # Only the leaf rows that were reached are read and converted
+            reached = np.flatnonzero(np.bincount(leaves.ravel(), minlength=len(self.leaf_values)))
+            position = np.zeros(len(self.leaf_values), dtype=np.int32)
+            position[reached] = np.arange(len(reached), dtype=np.int32)
+            table = self.leaf_values[reached].astype(float) / self.value_scale
+            indicator = sp.csr_matrix(
+                (np.ones(leaves.size), position[leaves.ravel()], np.arange(0, leaves.size + 1, self.n_trees)),
+                shape=(len(leaves), len(reached))
+            )
+            results.append(indicator @ table / self.n_trees)
+        if not results:
+            return np.zeros((0, len(self.classes_)))
+        return np.vstack(results)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def contributions(self, X):
+        """Tree-path (Saabas) decomposition of predict_proba.
+
+        Every split on a row's path moves the class fractions from the node's value
+        to its child's; the move is credited to the split feature and averaged over
+        the trees. Returns (bias, contributions): the mean root value per class and
+        an (n_samples, n_features, n_classes) array, which add up to predict_proba.
+        The array is dense, so large inputs should go through iter_contributions.
+        """
+        chunks = list(self.iter_contributions(X))
+        if not chunks:
+            return self._bias(), np.zeros((0, X.shape[1], len(self.classes_)))
+        return chunks[0][1], np.concatenate([contributions for _, _, contributions in chunks])
+
+    def iter_contributions(self, X):
+        """(start row, bias, contributions) for consecutive row chunks of X.
+
+        Both the row-tree pairs and the contribution cells of a chunk are bounded by
+        PAIRS_PER_CHUNK, so callers that reduce each chunk work in bounded memory.
+        """
+        if self.node_values is None:
+            raise ValueError("The forest was exported without node values; export it again to explain predictions")
+        cells_per_row = X.shape[1] * len(self.classes_)
+        chunk_rows = max(1, min(PAIRS_PER_CHUNK // self.n_trees, PAIRS_PER_CHUNK // cells_per_row))
+        bias = self._bias()
+        for start in range(0, X.shape[0], chunk_rows):
+            yield start, bias, self._chunk_contributions(X[start:start + chunk_rows])
+
+    def _values_of(self, pointers):
+        """Class fractions of internal nodes (pointers >= 0) and leaves (~pointer)."""
+        return np.where(
+            (pointers >= 0)[:, None],
+            self.node_values[np.maximum(pointers, 0)].astype(float),
+            self.leaf_values[np.maximum(~pointers, 0)].astype(float)
+        ) / self.value_scale
+
+    def _bias(self):
+        return self._values_of(self.roots).mean(axis=0)
+
+    def _chunk_contributions(self, X):
+        X = self._dense(X)
+        n_samples, n_features = X.shape
+        n_trees = self.n_trees
+        index_type = np.int32 if X.size < 2 ** 31 else np.int64
+        pair_rows = np.repeat(np.arange(n_samples, dtype=index_type), n_trees)
+        values = X.ravel()
+        children = self.children.ravel()
+        nodes = np.tile(self.roots, n_samples)
+        totals = np.zeros((n_samples * n_features, len(self.classes_)))
+        active = np.flatnonzero(nodes >= 0)
+        while active.size:
+            current = nodes[active]
+            split_features = self.feature[current]
+            go_right = values[pair_rows[active] * n_features + split_features] > self.threshold[current]
+            following = children[2 * current + go_right]
+            change = self._values_of(following) - self.node_values[current].astype(float) / self.value_scale
+            np.add.at(totals, pair_rows[active] * n_features + split_features, change)
+            nodes[active] = following
+            active = active[following >= 0]
+        return totals.reshape(n_samples, n_features, -1) / n_trees
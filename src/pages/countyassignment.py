@@ -0,0 +1,61 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import requests
+from .datacache import CACHE_DIR, cached
+from .spatialindex import GridIndex, points_in_polygon
+
+
+COUNTY_GEOJSON_PATH = os.path.join(CACHE_DIR, 'maryland-counties.geojson')
+COUNTY_GEOJSON_URL = 'https://raw.githubusercontent.com/frankrowe/maryland-geojson/master/maryland-counties.geojson'
+COUNTY_ASSIGNMENT_VERSION = 1
+UNKNOWN_COUNTY = 'Outside Maryland'
+
+
+def load_county_geojson(path=COUNTY_GEOJSON_PATH, url=COUNTY_GEOJSON_URL):
+    """Read the county boundaries, downloading them once if the local copy is missing."""
+    if not os.path.exists(path):
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(response.text)
+    with open(path) as f:
+        return json.load(f)
+
+
+def county_polygons(geojson):
+    """Yield (county name, rings) for every polygon in a GeoJSON feature collection."""
+    for feature in geojson['features']:
+        geometry = feature['geometry']
+        name = feature['properties'].get('name', 'Unknown')
+        polygons = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+        for rings in polygons:
+            yield name, rings
+
+
+def assign_counties(lat, lon, geojson, cell_size=0.05):
+    """Return the county name containing each point, UNKNOWN_COUNTY where none does."""
+    grid = GridIndex(lat, lon, cell_size)
+    counties = np.full(len(grid.lat), UNKNOWN_COUNTY, dtype=object)
+    assigned = np.zeros(len(grid.lat), dtype=bool)
+
+    for name, rings in county_polygons(geojson):
+        outer = np.asarray(rings[0], dtype=float)
+        candidates = grid.bbox(outer[:, 1].min(), outer[:, 0].min(), outer[:, 1].max(), outer[:, 0].max())
+        candidates = candidates[~assigned[candidates]]
+        inside = candidates[points_in_polygon(grid.lat[candidates], grid.lon[candidates], rings)]
+        counties[inside] = name
+        assigned[inside] = True
+    return counties
+
+
+def load_counties(source, geojson_path=COUNTY_GEOJSON_PATH):
+    """County of every row of the source CSV, indexed like pd.read_csv(source)."""
+    def build():
+        coords = pd.read_csv(source, usecols=['Latitude', 'Longitude'])
+        counties = assign_counties(coords['Latitude'], coords['Longitude'], load_county_geojson(geojson_path))
+        return pd.Series(counties, index=coords.index, name='County').astype('category')
+
+    return cached('counties', source, build, version=COUNTY_ASSIGNMENT_VERSION)
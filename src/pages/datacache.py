@@ -0,0 +1,56 @@
+import hashlib
+import os
+import joblib
+import pandas as pd
+
+
+# Next to the app rather than the working directory, so the scripts under model src/ share it
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache')
+
+
+def source_fingerprint(path):
+    """Identify a source file by its path, size and modification time."""
+    stat = os.stat(path)
+    key = f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def cache_path(name, source, version=1, extension='joblib'):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, f'{name}-{source_fingerprint(source)}-v{version}.{extension}')
+
+
+def store_path(name, version=1, extension='joblib'):
+    """Path of a cache file that is kept across source changes and refreshed in place."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, f'{name}-v{version}.{extension}')
+
+
+def cached(name, source, build, version=1, is_valid=None):
+    """Load a value derived from source from the cache, building and storing it on a miss."""
+    path = cache_path(name, source, version)
+    if os.path.exists(path):
+        try:
+            value = joblib.load(path)
+            if is_valid is None or is_valid(value):
+                return value
+        except Exception:
+            pass
+
+    value = build()
+    joblib.dump(value, path)
+    return value
+
+
+def cached_frame(name, source, build, version=1, columns=None):
+    """Like cached, for a DataFrame stored as Parquet so readers can load only some columns."""
+    path = cache_path(name, source, version, extension='parquet')
+    if os.path.exists(path):
+        try:
+            return pd.read_parquet(path, columns=columns)
+        except Exception:
+            pass
+
+    frame = build()
+    frame.to_parquet(path)
+    return frame if columns is None else frame[columns]
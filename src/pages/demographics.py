@@ -1,10 +1,13 @@
-from dash import register_page, html, dcc, callback, Output, Input
+from dash import register_page, html, dcc, callback, Output, Input, Patch
 import pandas as pd
 import plotly.express as px
 import numpy as np
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go 
 from math import ceil
+from functools import lru_cache
+from .countyassignment import load_counties
+from .figurepatch import needs_full_figure
 
 register_page(__name__, path='/demographics', name='demographics')
 
@@ -37,15 +40,46 @@ def preprocess_data(df):
         (df['Longitude'] >= -79.5) & (df['Longitude'] <= -75)
     ]
     
-    df['Lat_Bin'] = np.round(df['Latitude'], 2)
-    df['Lon_Bin'] = np.round(df['Longitude'], 2)
     df['Count'] = 1
     
     return df
 
-df = pd.read_csv("Maryland_Traffic_Violation.csv")
+DATA_PATH = "Maryland_Traffic_Violation.csv"
+
+df = pd.read_csv(DATA_PATH)
 processed_df = preprocess_data(df)
-processed_df['County'] = 'Montgomery'
+processed_df['County'] = load_counties(DATA_PATH).reindex(processed_df.index)
+
+MAP_LOCATION_COLUMNS = {
+    'state': 'State',
+    'dl_state': 'DL State',
+    'driver_state': 'Driver State'
+}
+
+
+def build_state_counts(df):
+    """Count stops per state for every (map type, race, gender) choice, 'all' included."""
+    races = ['all'] + list(df['Race'].dropna().unique())
+    genders = ['all'] + list(df['Gender'].dropna().unique())
+    state_counts = {}
+    for map_type, location_col in MAP_LOCATION_COLUMNS.items():
+        group_counts = df.groupby(['Race', 'Gender', location_col], dropna=False).size()
+        group_races = group_counts.index.get_level_values(0)
+        group_genders = group_counts.index.get_level_values(1)
+        for race in races:
+            for gender in genders:
+                selected = np.ones(len(group_counts), dtype=bool)
+                if race != 'all':
+                    selected &= group_races == race
+                if gender != 'all':
+                    selected &= group_genders == gender
+                counts = group_counts[selected].groupby(level=2).sum()
+                state_counts[(map_type, race, gender)] = counts[counts > 0].sort_values(ascending=False, kind='stable')
+    return state_counts
+
+
+STATE_COUNTS = build_state_counts(processed_df)
+NO_STATE_COUNTS = pd.Series(dtype='int64')
 
 from dash import html, dcc, callback, Output, Input
 import plotly.express as px
@@ -162,27 +196,10 @@ def update_chart(show_demographics, demographics_type, search_metric, selected_r
     
     return fig
 
-@callback(
-    Output('choropleth-map', 'figure'),
-    [Input('map-type-radio', 'value'),
-     Input('race-filter', 'value'),
-     Input('gender-filter', 'value')]
-)
-def update_map(selected_map_type, selected_race, selected_gender):
-    filtered_df = processed_df.copy()
-    
-    if selected_race != 'all':
-        filtered_df = filtered_df[filtered_df['Race'] == selected_race]
-    if selected_gender != 'all':
-        filtered_df = filtered_df[filtered_df['Gender'] == selected_gender]
-    
-    location_col = {
-        'state': 'State',
-        'dl_state': 'DL State',
-        'driver_state': 'Driver State'
-    }[selected_map_type]
-    
-    stops_by_location = filtered_df[location_col].value_counts().reset_index()
+@lru_cache(maxsize=None)
+def state_map_figure(map_type, race, gender):
+    """Build the state choropleth with its text overlay for one filter choice."""
+    stops_by_location = STATE_COUNTS.get((map_type, race, gender), NO_STATE_COUNTS).reset_index()
     stops_by_location.columns = ['state', 'stops']
     
     fig = px.choropleth(
@@ -222,6 +239,24 @@ def update_map(selected_map_type, selected_race, selected_gender):
     
     return fig
 
+@callback(
+    Output('choropleth-map', 'figure'),
+    [Input('map-type-radio', 'value'),
+     Input('race-filter', 'value'),
+     Input('gender-filter', 'value')]
+)
+def update_map(selected_map_type, selected_race, selected_gender):
+    state_counts = STATE_COUNTS.get((selected_map_type, selected_race, selected_gender), NO_STATE_COUNTS)
+    if needs_full_figure():
+        return state_map_figure(selected_map_type, selected_race, selected_gender)
+
+    patch = Patch()
+    patch['data'][0]['locations'] = list(state_counts.index)
+    patch['data'][0]['z'] = state_counts.to_numpy()
+    patch['data'][1]['locations'] = list(state_counts.index)
+    patch['data'][1]['text'] = list(state_counts.index)
+    return patch
+
 @callback(
     Output('radar-chart', 'figure'),
     [Input('race-filter', 'value'),
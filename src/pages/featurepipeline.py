@@ -0,0 +1,315 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.cluster import KMeans
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import LabelEncoder
+
+
+FEATURE_PIPELINE_VERSION = 3
+
+# Code given to category values that were not seen at fit time
+UNKNOWN_CODE = -1
+
+BOOLEAN_COLUMNS = [
+    'Accident', 'Personal Injury', 'Property Damage',
+    'Fatal', 'Work Zone', 'Alcohol', 'HAZMAT',
+    'Commercial License', 'Commercial Vehicle'
+]
+
+# The first seven boolean columns make up the severity score
+SEVERITY_COLUMNS = BOOLEAN_COLUMNS[:7]
+
+CATEGORICAL_COLUMNS = ['Violation Type', 'VehicleType', 'SubAgency', 'Make', 'Color']
+
+REQUIRED_FIELDS = [
+    'Description', 'Time Of Stop', 'Latitude', 'Longitude', 'Points',
+    'Accident', 'Personal Injury', 'Property Damage', 'Fatal',
+    'Work Zone', 'Alcohol', 'HAZMAT', 'Commercial License',
+    'Commercial Vehicle', 'VehicleType', 'Violation Type',
+    'Make', 'Color', 'Driver State', 'DL State',
+    'Manufacture Year', 'SubAgency'
+]
+
+BASE_FEATURES = [
+    'Time_Hour',
+    'Location_Cluster',
+    'Severity_Score',
+    'Is_Commercial',
+    'Is_Local',
+    'Points',
+    'Vehicle_Age',
+    'Violation Type_Encoded',
+    'VehicleType_Encoded',
+    'SubAgency_Encoded',
+    'Make_Encoded',
+    'Color_Encoded'
+] + [f'{col}_Flag' for col in SEVERITY_COLUMNS]
+
+# Engineered columns that depend only on the row itself, with the compact types
+# they are materialized in; Time_Hour stays float to keep unparsed times missing
+ROW_FEATURE_DTYPES = {
+    'Time_Hour': 'float32',
+    'Severity_Score': 'int8',
+    'Is_Commercial': 'int8',
+    'Is_Local': 'int8',
+    'Vehicle_Age': 'float32',
+    **{f'{col}_Flag': 'int8' for col in SEVERITY_COLUMNS}
+}
+ROW_FEATURES = list(ROW_FEATURE_DTYPES)
+
+# Raw columns row_features reads
+ROW_FEATURE_FIELDS = BOOLEAN_COLUMNS + ['Time Of Stop', 'Driver State', 'DL State', 'Manufacture Year']
+
+
+def yes_no_flags(values):
+    """Vectorized convert_yes_no_to_bool: strings are True only for 'yes', anything else uses bool()."""
+    # Training read missing flags from CSV as NaN, which bool() turns into True; None and pd.NA follow suit
+    if values.dtype == object:
+        lowered = values.str.lower()
+        return pd.Series(
+            np.where(lowered.notna(), lowered == 'yes', values.isna() | values.astype(bool)),
+            index=values.index
+        )
+    return values.isna() | values.astype(bool)
+
+
+def stop_hours(times):
+    """Hour of each Time Of Stop value, parsing the common H:MM:SS form without inference."""
+    hours = pd.to_datetime(times, format='%H:%M:%S', errors='coerce').dt.hour
+    unparsed = hours.isna() & times.notna()
+    if unparsed.any():
+        hours[unparsed] = pd.to_datetime(times[unparsed]).dt.hour
+    return hours
+
+
+def row_features(X, current_year=None):
+    """The ROW_FEATURES of every row of X, in their compact types.
+
+    None of them depends on the fitted transformer, so they can be computed once
+    per extract and stored; Vehicle_Age is relative to current_year.
+    """
+    current_year = current_year or pd.Timestamp.now().year
+    flags = pd.DataFrame({col: yes_no_flags(X[col]) for col in BOOLEAN_COLUMNS}, index=X.index)
+    features = pd.DataFrame(index=X.index)
+    features['Time_Hour'] = stop_hours(X['Time Of Stop'])
+    for col in SEVERITY_COLUMNS:
+        features[f'{col}_Flag'] = flags[col].astype(int)
+    features['Severity_Score'] = features[[f'{col}_Flag' for col in SEVERITY_COLUMNS]].sum(axis=1)
+    features['Is_Commercial'] = (flags['Commercial License'] | flags['Commercial Vehicle']).astype(int)
+    features['Is_Local'] = (X['Driver State'] == X['DL State']).astype(int)
+    features['Vehicle_Age'] = current_year - pd.to_numeric(
+        X['Manufacture Year'],
+        errors='coerce'
+    ).fillna(current_year)
+    return features[ROW_FEATURES].astype(ROW_FEATURE_DTYPES)
+
+
+def nearest_centroids(points, centers):
+    """Index of the closest center for each (lat, lon) row; rows with missing coordinates get cluster 0."""
+    points = np.asarray(points, dtype=float)
+    distances = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    clusters = np.argmin(np.nan_to_num(distances, nan=np.inf), axis=1)
+    return clusters.astype(np.int32)
+
+
+def most_frequent(values, n):
+    """The n most frequent distinct values, most frequent first, as an object array."""
+    return values.value_counts(sort=True).index[:n].to_numpy(dtype=object)
+
+
+class DescriptionMemo:
+    """Bounded LRU table from description text to its TF-IDF row.
+
+    Each batch is factorized first, so only distinct descriptions that are not in
+    the table yet go through the vectorizer.
+    """
+
+    def __init__(self, tfidf, max_size=50000):
+        self.tfidf = tfidf
+        self.max_size = max_size
+        self.rows = OrderedDict()
+        # Shared by Dash callback threads and the prediction batcher thread
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def transform(self, descriptions):
+        """CSR TF-IDF matrix for a Series of descriptions, one row per entry."""
+        codes, uniques = pd.factorize(descriptions.fillna(''))
+        with self.lock:
+            rows = [self.rows.get(text) for text in uniques]
+            missing = [i for i, row in enumerate(rows) if row is None]
+            self.hits += len(rows) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            matrix = self.tfidf.transform([uniques[i] for i in missing])
+            for i, start, end in zip(missing, matrix.indptr[:-1], matrix.indptr[1:]):
+                rows[i] = (matrix.indices[start:end].copy(), matrix.data[start:end].copy())
+
+        with self.lock:
+            for text, row in zip(uniques, rows):
+                self.rows[text] = row
+                self.rows.move_to_end(text)
+            while len(self.rows) > self.max_size:
+                self.rows.popitem(last=False)
+
+        indptr = np.concatenate([[0], np.cumsum([len(indices) for indices, _ in rows])])
+        indices = np.concatenate([indices for indices, _ in rows]) if rows else np.zeros(0, dtype=np.int32)
+        data = np.concatenate([data for _, data in rows]) if rows else np.zeros(0)
+        distinct = sp.csr_matrix((data, indices, indptr), shape=(len(rows), len(self.tfidf.vocabulary_)))
+        return distinct[codes]
+
+
+class FineFeatureTransformer(BaseEstimator, TransformerMixin):
+    """Turn raw violation rows into the fine model's unscaled CSR feature matrix.
+
+    fit learns the description vocabulary, the location clusters and the category
+    codes, and compiles them into lookup tables; transform is column-wise array
+    work on top of those. Training and serving both go through this object.
+    """
+
+    def __init__(self, max_features=250, n_clusters=5, random_state=42, memo_size=50000):
+        self.max_features = max_features
+        self.n_clusters = n_clusters
+        self.random_state = random_state
+        self.memo_size = memo_size
+
+    def fit(self, X, y=None):
+        self.tfidf_ = TfidfVectorizer(max_features=self.max_features, stop_words='english')
+        self.tfidf_.fit(X['Description'].fillna(''))
+        self.location_model_ = KMeans(n_clusters=self.n_clusters, random_state=self.random_state)
+        self.location_model_.fit(X[['Latitude', 'Longitude']].dropna())
+        self.label_encoders_ = {col: LabelEncoder().fit(X[col].astype(str)) for col in CATEGORICAL_COLUMNS}
+        # Stored with the model so serving processes warm the memo from the training traffic
+        self.frequent_descriptions_ = most_frequent(X['Description'].fillna(''), self.memo_size)
+        return self._compile()
+
+    @classmethod
+    def from_components(cls, tfidf, location_model, label_encoders):
+        """Wrap the separately pickled parts of an older artifact in a fitted transformer."""
+        transformer = cls(max_features=tfidf.max_features, n_clusters=location_model.n_clusters)
+        transformer.tfidf_ = tfidf
+        transformer.location_model_ = location_model
+        transformer.label_encoders_ = label_encoders
+        return transformer._compile()
+
+    def _compile(self):
+        self.cluster_centers_ = np.asarray(self.location_model_.cluster_centers_, dtype=float)
+        self.category_index_ = {col: pd.Index(encoder.classes_) for col, encoder in self.label_encoders_.items()}
+        self.feature_names_out_ = np.array(
+            BASE_FEATURES + [f'desc_{i}' for i in range(len(self.tfidf_.vocabulary_))],
+            dtype=object
+        )
+        self._counts_lock = threading.Lock()
+        self.reset_counts()
+        return self
+
+    def __getstate__(self):
+        # The memo and the counters describe one process's traffic, not the fitted model
+        state = super().__getstate__()
+        for name in ('_memo', '_counts_lock', 'encoded_counts', 'unknown_counts'):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        if 'label_encoders_' in state and 'category_index_' not in state:
+            self._compile()
+        elif 'label_encoders_' in state:
+            self._counts_lock = threading.Lock()
+            self.reset_counts()
+
+    def fit_transform(self, X, y=None):
+        features = self.fit(X, y).transform(X)
+        # unknown_rates describes serving traffic, not the rows the codes were fitted on
+        self.reset_counts()
+        return features
+
+    @property
+    def memo(self):
+        if getattr(self, '_memo', None) is None:
+            self._memo = DescriptionMemo(self.tfidf_, self.memo_size)
+        return self._memo
+
+    def warm(self, descriptions=None):
+        """Preload the TF-IDF rows of the most frequent descriptions.
+
+        Defaults to the training descriptions stored at fit time; transformers fitted
+        before they were stored are left cold.
+        """
+        if descriptions is None:
+            descriptions = getattr(self, 'frequent_descriptions_', [])
+        descriptions = most_frequent(pd.Series(descriptions, dtype=object), self.memo_size)
+        if len(descriptions):
+            self.memo.transform(pd.Series(descriptions, dtype=object))
+        return self
+
+    def encode(self, col, values):
+        """Label codes of a category column through a hashed index, UNKNOWN_CODE for unseen values."""
+        # Missing values were encoded as the string 'nan' at fit time, whatever the reader produced
+        labels = values.astype(object).where(values.notna(), 'nan').astype(str)
+        codes = self.category_index_[col].get_indexer(labels)
+        unknown = int((codes == UNKNOWN_CODE).sum())
+        # Dash callback threads and the prediction batcher thread encode at once
+        with self._counts_lock:
+            self.encoded_counts[col] += len(codes)
+            self.unknown_counts[col] += unknown
+        return codes
+
+    def reset_counts(self):
+        with self._counts_lock:
+            self.encoded_counts = {col: 0 for col in CATEGORICAL_COLUMNS}
+            self.unknown_counts = {col: 0 for col in CATEGORICAL_COLUMNS}
+
+    def unknown_rates(self):
+        """Share of encoded values per category column that were unseen at fit time."""
+        with self._counts_lock:
+            return {
+                col: self.unknown_counts[col] / self.encoded_counts[col] if self.encoded_counts[col] else 0.0
+                for col in CATEGORICAL_COLUMNS
+            }
+
+    def engineer(self, X):
+        """Return the engineered columns, one row per row of X."""
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in X.columns]
+        if missing_fields:
+            raise ValueError(f"Missing required fields: {missing_fields}")
+
+        # Rows read from the feature store already carry their row features
+        if all(col in X.columns for col in ROW_FEATURES):
+            features = X[ROW_FEATURES].copy()
+        else:
+            features = row_features(X)
+
+        features['Time_Period'] = pd.cut(
+            features['Time_Hour'],
+            bins=[0, 6, 12, 18, 24],
+            labels=['Night', 'Morning', 'Afternoon', 'Evening']
+        )
+        # Rows that went through ingest already carry their cluster
+        if 'Location_Cluster' in X.columns:
+            features['Location_Cluster'] = X['Location_Cluster'].astype(np.int32)
+        else:
+            features['Location_Cluster'] = nearest_centroids(X[['Latitude', 'Longitude']], self.cluster_centers_)
+
+        features['Points'] = X['Points']
+
+        for col in CATEGORICAL_COLUMNS:
+            features[f'{col}_Encoded'] = self.encode(col, X[col])
+        return features
+
+    def matrix(self, X, features):
+        """Unscaled CSR model input: the base features followed by the TF-IDF description columns."""
+        base = features[BASE_FEATURES].to_numpy(dtype=float)
+        base[np.isnan(base)] = 0
+        return sp.hstack([sp.csr_matrix(base), self.memo.transform(X['Description'])], format='csr')
+
+    def transform(self, X):
+        return self.matrix(X, self.engineer(X))
+
+    def get_feature_names_out(self, input_features=None):
+        return self.feature_names_out_
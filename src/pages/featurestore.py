@@ -0,0 +1,19 @@
+import pandas as pd
+from .datacache import cached_frame
+from .featurepipeline import FEATURE_PIPELINE_VERSION, ROW_FEATURE_FIELDS, row_features
+
+
+def load_row_features(source, columns=None):
+    """The model's row features for every row of the source CSV, indexed like pd.read_csv(source).
+
+    They are computed once per source file and feature-pipeline version and kept as
+    compact Parquet columns. Vehicle_Age is relative to the current year, so the
+    store is rebuilt when the year turns.
+    """
+    current_year = pd.Timestamp.now().year
+
+    def build():
+        return row_features(pd.read_csv(source, usecols=ROW_FEATURE_FIELDS), current_year)
+
+    version = f'{FEATURE_PIPELINE_VERSION}-{current_year}'
+    return cached_frame('row-features', source, build, version=version, columns=columns)
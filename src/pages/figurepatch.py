@@ -0,0 +1,47 @@
+from dash import Patch, ctx
+
+
+def needs_full_figure(*structural_ids):
+    """Return True on first render or when an input that changes the figure layout fired."""
+    triggered = {component_id for component_id in ctx.triggered_prop_ids.values() if component_id}
+    return not triggered or bool(triggered & set(structural_ids))
+
+
+def _get_path(container, path):
+    for key in path.split('.'):
+        if isinstance(container, dict):
+            container = container.get(key)
+        elif isinstance(container, (list, tuple)) and key.isdigit() and int(key) < len(container):
+            container = container[int(key)]
+        else:
+            return None
+    return container
+
+
+def _set_path(patch, path, value):
+    keys = path.split('.')
+    for key in keys[:-1]:
+        patch = patch[int(key) if key.isdigit() else key]
+    last = keys[-1]
+    patch[int(last) if last.isdigit() else last] = value
+
+
+def figure_patch(fig, trace_fields, layout_fields=(), traces=None, encode=None):
+    """Return a Patch carrying only the given trace and layout properties of fig.
+
+    Paths are dotted, e.g. 'marker.size' or 'xaxis.tickvals'. The trace fields are
+    copied for every trace, or only the trace indexes in traces, so fig must have
+    the same traces as the figure on screen. encode, if given, is applied to every
+    trace field value, e.g. a geoencoding.coordinate_encoder.
+    """
+    figure = fig.to_dict()
+    patch = Patch()
+    for index, trace in enumerate(figure['data']):
+        if traces is not None and index not in traces:
+            continue
+        for path in trace_fields:
+            value = _get_path(trace, path)
+            _set_path(patch['data'][index], path, value if encode is None else encode(value))
+    for path in layout_fields:
+        _set_path(patch['layout'], path, _get_path(figure['layout'], path))
+    return patch
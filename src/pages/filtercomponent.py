@@ -60,19 +60,43 @@ def create_state_filter(df, filter_id='state-filter'):
         )
     ])
 
-def create_filter_panel(df):
+def create_county_filter(df, filter_id='county-filter'):
+    return html.Div([
+        html.Label('County', 
+                style={'fontWeight': 'bold', 
+                     
+                      'display': 'block',
+                      'fontFamily':'Monospace'}),
+        dcc.Dropdown(
+            id=filter_id,
+            options=[{'label': 'All Counties', 'value': 'all'}] + [
+                {'label': county, 'value': county}
+                for county in sorted(df['County'].dropna().unique())
+            ],
+            value=['all'],
+            multi=True,
+            style={'width': '100%'},
+            placeholder='Select counties...'
+        )
+    ], style={'marginBottom': '20px'})
+
+def create_filter_panel(df, include_county=False):
+    filters = [
+        create_year_filter(df),
+        create_month_filter(),
+        create_state_filter(df)
+    ]
+    if include_county:
+        filters.append(create_county_filter(df))
+
     return html.Div([
         
         
-        html.Div([
-            create_year_filter(df),
-            create_month_filter(),
-            create_state_filter(df)
-        ], style={'padding': '10px'})
+        html.Div(filters, style={'padding': '10px'})
     ],
  )
 
-def apply_filters(df, selected_year, selected_month, selected_states):
+def apply_filters(df, selected_year, selected_month, selected_states, selected_counties=None):
     filtered_df = df.copy()
     
     if selected_year != 'all':
@@ -81,5 +105,7 @@ def apply_filters(df, selected_year, selected_month, selected_states):
         filtered_df = filtered_df[filtered_df['Month'] == int(selected_month)]
     if 'all' not in selected_states:
         filtered_df = filtered_df[filtered_df['Driver State'].isin(selected_states)]
+    if selected_counties is not None and 'all' not in selected_counties:
+        filtered_df = filtered_df[filtered_df['County'].isin(selected_counties)]
         
     return filtered_df
\ No newline at end of file
@@ -0,0 +1,143 @@
+import copy
+import weakref
+import numpy as np
+import pandas as pd
+from .compactforest import CompactForest, raw_thresholds, scaler_terms
+from .featurepipeline import BASE_FEATURES, SEVERITY_COLUMNS, FineFeatureTransformer
+from .treeexplainer import TreeExplainer
+
+
+# Forest copies whose split thresholds absorb the scaler, keyed by the fitted model
+_RAW_SPACE_MODELS = weakref.WeakKeyDictionary()
+
+# Compact exports of artifacts that do not carry one, keyed by the fitted model
+_COMPACT_FORESTS = weakref.WeakKeyDictionary()
+
+# Feature transformers rebuilt from older artifacts, keyed by their fitted TF-IDF vectorizer
+_LEGACY_PIPELINES = weakref.WeakKeyDictionary()
+
+# Explainers with their cached explanations, keyed by the forest they explain
+_EXPLAINERS = weakref.WeakKeyDictionary()
+
+
+def feature_pipeline(model_dict):
+    """The fitted FineFeatureTransformer of a model artifact.
+
+    Artifacts saved before the transformer existed carry its parts under separate
+    keys; those are wrapped once per loaded model.
+    """
+    if 'feature_pipeline' in model_dict:
+        return model_dict['feature_pipeline']
+    pipeline = _LEGACY_PIPELINES.get(model_dict['tfidf'])
+    if pipeline is None:
+        pipeline = _LEGACY_PIPELINES[model_dict['tfidf']] = FineFeatureTransformer.from_components(
+            model_dict['tfidf'], model_dict['location_model'], model_dict['label_encoders']
+        )
+    return pipeline
+
+
+def fold_scaler(model, scaler):
+    """Copy a tree ensemble so it takes unscaled input.
+
+    A split x_scaled <= t is the same test as x <= t * scale + mean, so moving the
+    StandardScaler into the thresholds lets the sparse matrix be scored without
+    centring it, which would make every zero entry dense. An identity scaler, as
+    train_fines.py stores, needs no copy.
+    """
+    scale, mean = scaler_terms(scaler, model.n_features_in_)
+    if np.all(scale == 1) and np.all(mean == 0):
+        return model
+    folded = copy.deepcopy(model)
+    for estimator in folded.estimators_:
+        tree = estimator.tree_
+        split = tree.feature >= 0
+        features = tree.feature[split]
+        tree.threshold[split] = raw_thresholds(tree.threshold[split], scale[features], mean[features])
+    return folded
+
+
+def raw_space_model(model_dict):
+    """The model_dict forest with its scaler folded in, built once per loaded model."""
+    model = model_dict['model']
+    folded = _RAW_SPACE_MODELS.get(model)
+    if folded is None:
+        folded = _RAW_SPACE_MODELS[model] = fold_scaler(model, model_dict['scaler'])
+    return folded
+
+
+def forest_model(model_dict):
+    """The compact forest that scores and explains an artifact's unscaled features.
+
+    Artifacts without a compact forest, or with one exported before node values
+    were stored, get one exported from the sklearn forest once per loaded model;
+    its thresholds absorb the scaler, so no folded sklearn copy is kept.
+    """
+    forest = model_dict.get('compact_forest')
+    if 'model' not in model_dict or (forest is not None and forest.node_values is not None):
+        return forest
+    model = model_dict['model']
+    compact = _COMPACT_FORESTS.get(model)
+    if compact is None:
+        compact = _COMPACT_FORESTS[model] = CompactForest.from_sklearn(model, model_dict['scaler'])
+    return compact
+
+
+def predict_fine_categories(df, model_dict):
+    """Score every violation in df with a single predict_proba call.
+
+    Returns (predictions, probabilities): predictions holds the predicted category,
+    confidence and the engineered risk columns, probabilities has one column per
+    fine category. Both are indexed like df.
+    """
+    pipeline = feature_pipeline(model_dict)
+    features = pipeline.engineer(df)
+    probabilities = forest_model(model_dict).predict_proba(pipeline.matrix(df, features))
+    classes = model_dict['classes']
+
+    predictions = pd.DataFrame({
+        'predicted_category': classes[probabilities.argmax(axis=1)],
+        'confidence': probabilities.max(axis=1),
+        'severity_risk': features['Severity_Score'].to_numpy() / len(SEVERITY_COLUMNS),
+        'location_cluster': features['Location_Cluster'].to_numpy(),
+        'commercial_vehicle': features['Is_Commercial'].to_numpy().astype(bool),
+        'time_period': features['Time_Period'].to_numpy()
+    }, index=df.index)
+    for col in SEVERITY_COLUMNS:
+        predictions[f'{col}_Flag'] = features[f'{col}_Flag'].to_numpy()
+
+    return predictions, pd.DataFrame(probabilities, index=df.index, columns=classes)
+
+
+def explanation_names(pipeline):
+    """Feature names for explanations, with description columns named by their term."""
+    return BASE_FEATURES + [f'Description: {term}' for term in pipeline.tfidf_.get_feature_names_out()]
+
+
+def fine_explainer(model_dict):
+    """The TreeExplainer of the forest forest_model scores with, built once per loaded forest."""
+    forest = forest_model(model_dict)
+    if forest.node_values is None:
+        raise ValueError("The artifact's compact forest has no node values; export it again to explain predictions")
+    explainer = _EXPLAINERS.get(forest)
+    if explainer is None:
+        explainer = _EXPLAINERS[forest] = TreeExplainer(forest, explanation_names(feature_pipeline(model_dict)))
+    return explainer
+
+
+def explain_fine_categories(df, model_dict, categories=None, top_n=5):
+    """The top_n feature contributions to each row's category, as (feature, contribution) lists.
+
+    categories defaults to the predicted category of every row.
+    """
+    explainer = fine_explainer(model_dict)
+    X = feature_pipeline(model_dict).transform(df)
+    if categories is None:
+        # Bias plus a row's contributions is its predict_proba row
+        class_indexes = [
+            int(np.argmax(explainer.bias + contributions.sum(axis=0)))
+            for _, contributions in explainer.explain(X)
+        ]
+    else:
+        classes = list(model_dict['classes'])
+        class_indexes = [classes.index(category) for category in categories]
+    return explainer.top_features(X, class_indexes, top_n)
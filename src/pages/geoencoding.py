@@ -0,0 +1,99 @@
+import base64
+import numpy as np
+
+
+MAX_ZOOM_TIER = 14
+
+# Simplification and quantization keep outlines within this many screen pixels
+PIXEL_TOLERANCE = 0.5
+
+
+def zoom_tier(zoom):
+    """Round a mapbox zoom level down to the integer tier used for caching."""
+    return int(np.clip(np.floor(zoom), 0, MAX_ZOOM_TIER))
+
+
+def view_zoom_tier(bounds, width):
+    """Zoom tier with the same degrees per pixel as bounds drawn width pixels wide."""
+    south, west, north, east = bounds
+    return zoom_tier(np.log2(360 * width / (512 * (east - west))))
+
+
+def tier_tolerance(tier):
+    """Degrees covered by PIXEL_TOLERANCE screen pixels at a zoom tier."""
+    return PIXEL_TOLERANCE * 360 / (512 * 2 ** tier)
+
+
+def tier_decimals(tier):
+    """Decimal places that keep quantized coordinates within the tier's tolerance."""
+    return int(np.clip(np.ceil(-np.log10(tier_tolerance(tier))), 0, 7))
+
+
+def simplify_line(points, tolerance):
+    """Douglas-Peucker simplification of an (n, 2) array, keeping the first and last points."""
+    points = np.asarray(points, dtype=float)
+    if len(points) < 3:
+        return points
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.extend([(start, split), (split, end)])
+    return points[keep]
+
+
+def simplify_ring(ring, tolerance):
+    """Simplify a closed polygon ring, never collapsing it below a triangle."""
+    ring = np.asarray(ring, dtype=float)
+    simplified = simplify_line(ring, tolerance)
+    if len(simplified) < 4 and len(ring) >= 4:
+        simplified = ring[np.linspace(0, len(ring) - 1, 4).astype(int)]
+    return simplified
+
+
+def quantize(values, decimals):
+    return np.round(np.asarray(values, dtype=float), decimals)
+
+
+def typed_array(values, dtype='f4'):
+    """Encode a numeric array as a Plotly typed-array spec with base64 little-endian data."""
+    array = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    return {'dtype': dtype, 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def coordinate_encoder(decimals=5):
+    """Return an encoder that quantizes coordinate arrays and packs them as float32."""
+    def encode(value):
+        if value is None or isinstance(value, (str, dict)):
+            return value
+        array = np.asarray(value)
+        if array.ndim != 1 or not np.issubdtype(array.dtype, np.number):
+            return value
+        return typed_array(quantize(array, decimals), 'f4')
+    return encode
+
+
+def encode_traces(figure, fields, encode, traces=None):
+    """Encode the given fields of every trace, or of the listed trace indexes, of a figure dict."""
+    for index, trace in enumerate(figure['data']):
+        if traces is not None and index not in traces:
+            continue
+        for field in fields:
+            if field in trace:
+                trace[field] = encode(trace[field])
+    return figure
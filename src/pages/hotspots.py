@@ -0,0 +1,146 @@
+import hashlib
+import os
+import joblib
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from .datacache import store_path
+from .spatialbinning import aggregate_cells, grid_cols
+
+
+HOTSPOT_VERSION = 1
+
+# Metric name -> column summed per cell; None counts violations
+HOTSPOT_METRICS = {
+    'violation': None,
+    'fine': 'Total_Fine',
+    'fatal': 'Fatal_Count'
+}
+
+# Two-sided p-value thresholds for Gi_Bin levels 3, 2 and 1 (99%, 95%, 90% confidence)
+CONFIDENCE_LEVELS = ((3, 0.01), (2, 0.05), (1, 0.10))
+
+
+def neighbor_sums(ids, values, resolution, radius=1):
+    """Sum values and count occupied cells in the (2 * radius + 1)^2 block around each cell."""
+    cols = grid_cols(resolution)
+    sums = np.zeros(len(ids))
+    counts = np.zeros(len(ids))
+    for d_row in range(-radius, radius + 1):
+        for d_col in range(-radius, radius + 1):
+            neighbor = ids + d_row * cols + d_col
+            positions = np.minimum(np.searchsorted(ids, neighbor), len(ids) - 1)
+            found = ids[positions] == neighbor
+            sums[found] += values[positions[found]]
+            counts[found] += 1
+    return sums, counts
+
+
+def gi_star(ids, values, resolution, radius=1):
+    """Getis-Ord Gi* z-scores of values on sorted grid cell IDs, using binary block weights."""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n < 2:
+        return np.zeros(n)
+
+    mean = values.mean()
+    spread = np.sqrt(max((values ** 2).mean() - mean ** 2, 0))
+    local_sum, weights = neighbor_sums(ids, values, resolution, radius)
+
+    numerator = local_sum - mean * weights
+    denominator = spread * np.sqrt(np.maximum(n * weights - weights ** 2, 0) / (n - 1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(denominator > 0, numerator / denominator, 0.0)
+    return z
+
+
+def hotspot_bins(z):
+    """Classify z-scores into -3..3: the sign marks hot or cold, the size the confidence level."""
+    p = 2 * norm.sf(np.abs(z))
+    bins = np.zeros(len(z), dtype=np.int8)
+    for level, threshold in reversed(CONFIDENCE_LEVELS):
+        bins[p < threshold] = level
+    return bins * np.sign(z).astype(np.int8)
+
+
+def slice_fingerprint(cells, resolution, radius):
+    """Identify the aggregated input of a slice so unchanged slices can be reused."""
+    digest = hashlib.sha1(f'{resolution}:{radius}'.encode())
+    digest.update(cells['Cell_ID'].to_numpy().tobytes())
+    for column in ['Count'] + [column for column in HOTSPOT_METRICS.values() if column]:
+        digest.update(cells[column].to_numpy(dtype=float).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def compute_slice(cells, resolution, radius):
+    """Return {metric: DataFrame} of Gi* results for one aggregated slice."""
+    results = {}
+    for metric, column in HOTSPOT_METRICS.items():
+        values = cells['Count'] if column is None else cells[column]
+        z = gi_star(cells['Cell_ID'].to_numpy(), values.to_numpy(), resolution, radius)
+        results[metric] = pd.DataFrame({
+            'Cell_ID': cells['Cell_ID'].to_numpy(),
+            'Latitude': cells['Latitude'].to_numpy(),
+            'Longitude': cells['Longitude'].to_numpy(),
+            'Gi_Z': z,
+            'Gi_Bin': hotspot_bins(z)
+        })
+    return results
+
+
+def slice_rows(df):
+    """Map every (year, month) slice key, 'all' included, to its row positions."""
+    by_month = {
+        (int(year), str(int(month))): rows
+        for (year, month), rows in df.groupby(['Year', 'Month']).indices.items()
+    }
+    slices = {('all', 'all'): np.arange(len(df))}
+    slices.update(by_month)
+    for year in {year for year, _ in by_month}:
+        slices[(year, 'all')] = np.sort(np.concatenate([rows for (y, _), rows in by_month.items() if y == year]))
+    for month in {month for _, month in by_month}:
+        slices[('all', month)] = np.sort(np.concatenate([rows for (_, m), rows in by_month.items() if m == month]))
+    return slices
+
+
+def load_hotspots(df, resolution, name='hotspots', radius=1):
+    """Gi* hotspots per metric and year/month slice, keyed like the year and month filters.
+
+    df needs Cell_ID at the given resolution, Year, Month and the metric columns.
+    Slices whose aggregated cells did not change since the last run are read from
+    the cache instead of being recomputed.
+    """
+    path = store_path(name, HOTSPOT_VERSION)
+    previous = {}
+    if os.path.exists(path):
+        try:
+            previous = joblib.load(path)
+        except Exception:
+            previous = {}
+
+    ids = df['Cell_ID'].to_numpy()
+    weights = {column: df[column].to_numpy() for column in HOTSPOT_METRICS.values() if column}
+    hotspots = {}
+    changed = False
+    for key, rows in slice_rows(df).items():
+        cells = aggregate_cells(ids[rows], resolution, **{column: values[rows] for column, values in weights.items()})
+        fingerprint = slice_fingerprint(cells, resolution, radius)
+        cached_slice = previous.get(key)
+        if cached_slice is not None and cached_slice['fingerprint'] == fingerprint:
+            hotspots[key] = cached_slice
+        else:
+            hotspots[key] = {'fingerprint': fingerprint, 'metrics': compute_slice(cells, resolution, radius)}
+            changed = True
+
+    if changed or hotspots.keys() != previous.keys():
+        joblib.dump(hotspots, path)
+    return hotspots
+
+
+def significant_cells(hotspots, metric, year='all', month='all'):
+    """Return the hot and cold cells of one metric and slice, or None if the slice is empty."""
+    hotspot_slice = hotspots.get((year if year == 'all' else int(year), str(month)))
+    if hotspot_slice is None:
+        return None
+    cells = hotspot_slice['metrics'][metric]
+    return cells[cells['Gi_Bin'] != 0]
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from .datacache import cached
+from .featurepipeline import nearest_centroids
+
+
+LOCATION_CLUSTER_VERSION = 1
+
+# Fine category width used by the model target, Fine // 10
+FINE_CATEGORY_WIDTH = 10
+
+
+def assign_location_clusters(lat, lon, centers):
+    """Nearest location-model centroid of every stop as int8, 0 where coordinates are missing."""
+    if len(centers) > np.iinfo(np.int8).max:
+        raise ValueError(f"{len(centers)} clusters do not fit an int8 column")
+    points = np.column_stack([np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)])
+    return nearest_centroids(points, centers).astype(np.int8)
+
+
+def load_location_clusters(source, centers):
+    """Location_Cluster of every row of the source CSV, indexed like pd.read_csv(source).
+
+    The assignment is cached with the centroids it was made with, so a model with
+    different clusters triggers a new pass over the source.
+    """
+    centers = np.asarray(centers, dtype=float)
+
+    def build():
+        coords = pd.read_csv(source, usecols=['Latitude', 'Longitude'])
+        clusters = assign_location_clusters(coords['Latitude'], coords['Longitude'], centers)
+        return centers, pd.Series(clusters, index=coords.index, name='Location_Cluster')
+
+    def is_valid(value):
+        return np.array_equal(value[0], centers)
+
+    _, clusters = cached('location-clusters', source, build, version=LOCATION_CLUSTER_VERSION, is_valid=is_valid)
+    return clusters
+
+
+def cluster_summaries(frame, fine_column='Total_Fine', mix_column='Violation Type'):
+    """Per-cluster stop counts, fine statistics, fine-category shares and category mix.
+
+    frame needs a Location_Cluster column; rows without coordinates are left out.
+    Returns a dict of DataFrames indexed by cluster.
+    """
+    frame = frame[frame['Latitude'].notna() & frame['Longitude'].notna()]
+    groups = frame.groupby('Location_Cluster', observed=True)
+    fines = groups[fine_column]
+    summary = pd.DataFrame({
+        'Stops': groups.size(),
+        'Mean_Fine': fines.mean(),
+        'Median_Fine': fines.median(),
+        'P90_Fine': fines.quantile(0.9),
+        'Zero_Fine_Share': (frame[fine_column] == 0).groupby(frame['Location_Cluster']).mean()
+    })
+    fine_categories = (frame[fine_column] // FINE_CATEGORY_WIDTH).rename('Fine_Category')
+    fine_mix = pd.crosstab(frame['Location_Cluster'], fine_categories, normalize='index')
+    category_mix = pd.crosstab(frame['Location_Cluster'], frame[mix_column].fillna('Unknown'), normalize='index')
+    summary['Top_Category'] = category_mix.idxmax(axis=1)
+    summary['Top_Category_Share'] = category_mix.max(axis=1)
+    return {'summary': summary, 'fine_mix': fine_mix, 'category_mix': category_mix}
@@ -0,0 +1,72 @@
+import numpy as np
+
+
+RESOLUTION_TIERS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Degrees of latitude/longitude visible on a scope='usa' geo map at projection_scale=1,
+# wide enough to cover the Alaska and Hawaii insets
+GEO_USA_SPAN = (45.0, 100.0)
+
+
+def is_viewport_change(relayout_data):
+    """Return True if a relayoutData event moved or zoomed a map."""
+    if not relayout_data:
+        return False
+    return any(
+        key.startswith('mapbox.') or key.startswith('geo.center') or key.startswith('geo.projection')
+        for key in relayout_data
+    )
+
+
+def mapbox_bounds(relayout_data):
+    """Return (south, west, north, east) of a mapbox viewport, or None if unknown."""
+    if not relayout_data:
+        return None
+
+    derived = relayout_data.get('mapbox._derived') or {}
+    coordinates = derived.get('coordinates')
+    if not coordinates:
+        return None
+
+    lons = [coord[0] for coord in coordinates]
+    lats = [coord[1] for coord in coordinates]
+    return min(lats), min(lons), max(lats), max(lons)
+
+
+def mapbox_view_bounds(center, zoom, width, height):
+    """Approximate (south, west, north, east) shown by a mapbox map of the given pixel size."""
+    degrees_per_pixel = 360 / (512 * 2 ** zoom)
+    half_lon = degrees_per_pixel * width / 2
+    half_lat = degrees_per_pixel * height / 2 * np.cos(np.radians(center[0]))
+    return center[0] - half_lat, center[1] - half_lon, center[0] + half_lat, center[1] + half_lon
+
+
+def geo_bounds(relayout_data, center, scale, span=GEO_USA_SPAN):
+    """Return (south, west, north, east) of a geo viewport, falling back to the figure defaults."""
+    relayout_data = relayout_data or {}
+    center_lat = relayout_data.get('geo.center.lat', center[0])
+    center_lon = relayout_data.get('geo.center.lon', center[1])
+    scale = relayout_data.get('geo.projection.scale', scale) or scale
+
+    half_lat = span[0] / scale / 2
+    half_lon = span[1] / scale / 2
+    return center_lat - half_lat, center_lon - half_lon, center_lat + half_lat, center_lon + half_lon
+
+
+def pad_bounds(bounds, fraction=0.25):
+    """Grow bounds on every side so small pans do not expose empty edges."""
+    south, west, north, east = bounds
+    lat_pad = (north - south) * fraction
+    lon_pad = (east - west) * fraction
+    return south - lat_pad, west - lon_pad, north + lat_pad, east + lon_pad
+
+
+def resolution_for_bounds(bounds, max_cells=400):
+    """Pick the coarsest grid tier that still gives about max_cells cells across the view."""
+    south, west, north, east = bounds
+    target = max(north - south, east - west) / max_cells
+    for resolution in RESOLUTION_TIERS:
+        if resolution >= target:
+            return resolution
+    return RESOLUTION_TIERS[-1]
+
@@ -0,0 +1,79 @@
+import os
+import threading
+import joblib
+
+
+MODEL_PATH = 'fine_prediction_model.joblib'
+
+
+def save_artifact(model_dict, path=MODEL_PATH):
+    """Write a model artifact uncompressed so its arrays can be memory-mapped.
+
+    The file is written next to the target and moved into place, so workers that
+    still map the previous artifact keep reading the old inode.
+    """
+    temp_path = f'{path}.tmp'
+    joblib.dump(model_dict, temp_path, compress=0)
+    os.replace(temp_path, path)
+
+
+class ModelRegistry:
+    """Load a model artifact on first use and swap it when the file is replaced.
+
+    Arrays are memory-mapped read-only, so worker processes serving the same file
+    share those pages through the OS page cache instead of each holding a copy.
+    """
+
+    def __init__(self, path=MODEL_PATH, mmap_mode='r', on_load=None):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        self.load_hooks = [] if on_load is None else [on_load]
+        self.lock = threading.Lock()
+        self.model_dict = None
+        self.loaded_stamp = None
+
+    def _stamp(self, path):
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _load(self, path):
+        model_dict = joblib.load(path, mmap_mode=self.mmap_mode)
+        for hook in self.load_hooks:
+            hook(model_dict)
+        return model_dict
+
+    def add_load_hook(self, hook):
+        """Run hook on every model this registry loads, and on the current one if loaded."""
+        self.load_hooks.append(hook)
+        if self.model_dict is not None:
+            hook(self.model_dict)
+
+    def get(self):
+        """The current model_dict, loading it or picking up a replaced artifact file."""
+        stamp = self._stamp(self.path)
+        if self.model_dict is not None and stamp == self.loaded_stamp:
+            return self.model_dict
+
+        with self.lock:
+            if self.model_dict is None or stamp != self.loaded_stamp:
+                try:
+                    self.model_dict = self._load(self.path)
+                except Exception:
+                    # A half-written replacement keeps the previous model in service
+                    if self.model_dict is None:
+                        raise
+                self.loaded_stamp = stamp
+        return self.model_dict
+
+    def swap(self, path):
+        """Serve another artifact; it is fully loaded before the current model is replaced."""
+        model_dict = self._load(path)
+        with self.lock:
+            self.path = path
+            self.model_dict = model_dict
+            self.loaded_stamp = self._stamp(path)
+        return model_dict
+
+
+# The fine model of this process, shared by the price page and the prediction API
+MODEL_REGISTRY = ModelRegistry(MODEL_PATH)
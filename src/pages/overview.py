@@ -1,15 +1,24 @@
-from dash import register_page, html, dcc, callback, Output, Input
+from dash import register_page, html, dcc, callback, Output, Input, State, ctx, no_update
 import pandas as pd
 import plotly.express as px
-import requests
 import json
 import numpy as np
 import dash_bootstrap_components as dbc
+from functools import lru_cache
+from .countyassignment import county_polygons, load_counties, load_county_geojson
+from .figurepatch import figure_patch, needs_full_figure
 from .filtercomponent import create_filter_panel, apply_filters
+from .geoencoding import coordinate_encoder, encode_traces, simplify_ring, tier_decimals, tier_tolerance, zoom_tier
+from .hotspots import load_hotspots, significant_cells
+from .mapviewport import is_viewport_change, mapbox_bounds, pad_bounds, resolution_for_bounds
+from .spatialbinning import aggregate_cells, cell_ids
+from .spatialindex import load_grid_index
 
 
 register_page(__name__, path='/', name='overview')
 
+CELL_RESOLUTION = 0.01
+
 def preprocess_data(df):
     df['Date Of Stop'] = pd.to_datetime(df['Date Of Stop'], format='%m/%d/%Y')
     df['Year'] = df['Date Of Stop'].dt.year
@@ -40,8 +49,7 @@ def preprocess_data(df):
         (df['Longitude'] >= -79.5) & (df['Longitude'] <= -75)
     ]
     
-    df['Lat_Bin'] = np.round(df['Latitude'], 2)
-    df['Lon_Bin'] = np.round(df['Longitude'], 2)
+    df['Cell_ID'] = cell_ids(df['Latitude'], df['Longitude'], CELL_RESOLUTION)
     df['Count'] = 1
     
     def discretize_fatal(count):
@@ -55,31 +63,100 @@ def preprocess_data(df):
     df['Fatal_Count_Discrete'] = (df['Fatal'] == 'Yes').astype(int).apply(discretize_fatal)
     return df
 
-def aggregate_data(df):
-    agg_df = df.groupby(['Lat_Bin', 'Lon_Bin']).agg({
-        'Total_Fine': 'sum',
-        'Count': 'sum',
-        'Fatal_Count': 'sum',
-        'Fatal_Count_Discrete': 'max'
-    }).reset_index().rename(columns={
-        'Lat_Bin': 'Latitude', 
-        'Lon_Bin': 'Longitude', 
-        'Count': 'Violation_Count'
-    })
+def aggregate_data(df, resolution=CELL_RESOLUTION):
+    if resolution == CELL_RESOLUTION:
+        ids = df['Cell_ID'].values
+    else:
+        ids = cell_ids(df['Latitude'], df['Longitude'], resolution)
+
+    agg_df = aggregate_cells(
+        ids,
+        resolution,
+        Total_Fine=df['Total_Fine'],
+        Fatal_Count=df['Fatal_Count']
+    ).rename(columns={'Count': 'Violation_Count'})
     
-    agg_df['Fatal_Count_Discrete'] = agg_df['Fatal_Count'].apply(
-        lambda x: 0 if x == 0 else (1 if x == 1 else 2)
-    )
+    agg_df['Fatal_Count_Discrete'] = np.minimum(agg_df['Fatal_Count'], 2).astype(int)
     return agg_df
 
 
-df = pd.read_csv("Maryland_Traffic_Violation.csv")
-df = preprocess_data(df)
-df['County'] = 'Montgomery'
+DATA_PATH = "Maryland_Traffic_Violation.csv"
 
-maryland_geojson = requests.get(
-    "https://raw.githubusercontent.com/frankrowe/maryland-geojson/master/maryland-counties.geojson"
-).json()
+df = pd.read_csv(DATA_PATH)
+df = preprocess_data(df)
+df['County'] = load_counties(DATA_PATH).reindex(df.index)
+SPATIAL_INDEX = load_grid_index(df['Latitude'], df['Longitude'], DATA_PATH)
+
+maryland_geojson = load_county_geojson()
+
+HOTSPOTS = load_hotspots(df, CELL_RESOLUTION)
+HOTSPOT_COLORS = {
+    3: '#d7191c', 2: '#f46d43', 1: '#fdae61',
+    -1: '#abd9e9', -2: '#74add1', -3: '#2c7bb6'
+}
+HOTSPOT_LABELS = {
+    3: 'Hot spot (99%)', 2: 'Hot spot (95%)', 1: 'Hot spot (90%)',
+    -1: 'Cold spot (90%)', -2: 'Cold spot (95%)', -3: 'Cold spot (99%)'
+}
+MAP_ZOOM = 6.5
+
+
+def county_trace_indexes(geojson):
+    """Figure positions of the county ring traces and of the hotspot overlay after them.
+
+    The map draws the density trace first, then for each county one trace per
+    ring followed by its label, and finally the hotspot overlay.
+    """
+    ring_traces = []
+    index = 1
+    for feature in geojson['features']:
+        geometry = feature['geometry']
+        polygons = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+        ring_count = sum(len(rings) for rings in polygons)
+        ring_traces.extend(range(index, index + ring_count))
+        index += ring_count + 1
+    return ring_traces, index
+
+
+COUNTY_RING_TRACES, MAP_HOTSPOT_TRACE = county_trace_indexes(maryland_geojson)
+
+
+@lru_cache(maxsize=None)
+def county_rings(tier):
+    """County ring (lon, lat) arrays simplified for a zoom tier, in map trace order."""
+    rings = []
+    for _, polygon in county_polygons(maryland_geojson):
+        for ring in polygon:
+            simplified = simplify_ring(ring, tier_tolerance(tier))
+            rings.append((simplified[:, 0], simplified[:, 1]))
+    return rings
+
+
+def county_ring_patch(patch, tier):
+    """Add the county outlines simplified for a zoom tier to a map Patch."""
+    encode = coordinate_encoder(tier_decimals(tier))
+    for index, (lon, lat) in zip(COUNTY_RING_TRACES, county_rings(tier)):
+        patch['data'][index]['lon'] = encode(lon)
+        patch['data'][index]['lat'] = encode(lat)
+    return patch
+
+
+def hotspot_trace(metric, selected_year, selected_month, show_hotspots):
+    cells = significant_cells(HOTSPOTS, metric, selected_year, selected_month) if show_hotspots else None
+    if cells is None:
+        cells = pd.DataFrame({'Latitude': [], 'Longitude': [], 'Gi_Z': [], 'Gi_Bin': []})
+
+    return dict(
+        type='scattermapbox',
+        lat=cells['Latitude'].to_numpy(),
+        lon=cells['Longitude'].to_numpy(),
+        mode='markers',
+        marker=dict(size=7, opacity=0.8, color=[HOTSPOT_COLORS[b] for b in cells['Gi_Bin']]),
+        customdata=cells['Gi_Z'].to_numpy(),
+        text=[HOTSPOT_LABELS[b] for b in cells['Gi_Bin']],
+        hovertemplate='%{text}<br>Gi* z-score: %{customdata:.2f}<extra></extra>',
+        showlegend=False
+    )
 
 
 layout = html.Div([
@@ -99,7 +176,7 @@ layout = html.Div([
             ),
             
            html.Div(
-    create_filter_panel(df),
+    create_filter_panel(df, include_county=True),
     style={'padding': '10px'}
 )
         ],
@@ -256,10 +333,21 @@ layout = html.Div([
                     'gap': '8px'
                 },
                     ),
+                    dcc.Checklist(
+                        id='hotspot-toggle',
+                        options=[{'label': ' Show Gi* hotspots', 'value': 'show'}],
+                        value=[],
+                        style={
+                            'fontSize': '11px',
+                            'fontFamily': 'Monospace',
+                            'padding': '0 20px'
+                        }
+                    ),
                     dcc.Graph(
                         id='violation-map',
-                        style={'height': '330px'}
-                    )
+                        style={'height': '310px'}
+                    ),
+                    dcc.Store(id='violation-map-tier')
                 ])
             ],
             style={
@@ -391,13 +479,14 @@ style={
     [Input('subagency-metric', 'value'),
      Input('year-filter', 'value'),
      Input('month-filter', 'value'),
-     Input('state-filter', 'value')]
+     Input('state-filter', 'value'),
+     Input('county-filter', 'value')]
 )
-def update_subagency_bar(metric_type, selected_year, selected_month, selected_states):
+def update_subagency_bar(metric_type, selected_year, selected_month, selected_states, selected_counties):
     filtered_df = df.copy()
     
    
-    filtered_df = apply_filters(df, selected_year, selected_month, selected_states)
+    filtered_df = apply_filters(df, selected_year, selected_month, selected_states, selected_counties)
 
    
     def shorten_subagency(name):
@@ -472,7 +561,8 @@ def update_subagency_bar(metric_type, selected_year, selected_month, selected_st
         marker=dict(cornerradius = 5)
     )
 
-   
+    if not needs_full_figure('subagency-metric'):
+        return figure_patch(bar_fig, ['x', 'y'])
     
     return bar_fig
 
@@ -480,9 +570,10 @@ def update_subagency_bar(metric_type, selected_year, selected_month, selected_st
     Output('yearly-trend', 'figure'),
     [Input('trend-type', 'value'),
      Input('month-filter', 'value'),
-     Input('state-filter', 'value')]
+     Input('state-filter', 'value'),
+     Input('county-filter', 'value')]
 )
-def update_yearly_trend(trend_type, selected_month, selected_states):
+def update_yearly_trend(trend_type, selected_month, selected_states, selected_counties):
     filtered_df = df.copy()
     
     #
@@ -490,6 +581,8 @@ def update_yearly_trend(trend_type, selected_month, selected_states):
         filtered_df = filtered_df[filtered_df['Month'] == int(selected_month)]
     if 'all' not in selected_states:
         filtered_df = filtered_df[filtered_df['Driver State'].isin(selected_states)]
+    if 'all' not in selected_counties:
+        filtered_df = filtered_df[filtered_df['County'].isin(selected_counties)]
     
     
     yearly_data = filtered_df.groupby('Year').agg({
@@ -557,6 +650,8 @@ def update_yearly_trend(trend_type, selected_month, selected_states):
         hovertemplate=hover_template
     )
     
+    if not needs_full_figure('trend-type'):
+        return figure_patch(trend_fig, ['x', 'y'], ['xaxis.ticktext', 'xaxis.tickvals'])
     
     return trend_fig
 
@@ -565,12 +660,13 @@ def update_yearly_trend(trend_type, selected_month, selected_states):
     [Input('year-filter', 'value'),
      Input('month-filter', 'value'),
      Input('state-filter', 'value'),
+     Input('county-filter', 'value'),
      Input('chart-type', 'value')]  
 )
-def update_violation_pie(selected_year, selected_month, selected_states, chart_type):
+def update_violation_pie(selected_year, selected_month, selected_states, selected_counties, chart_type):
     filtered_df = df.copy()
     
-    filtered_df = apply_filters(df, selected_year, selected_month, selected_states)
+    filtered_df = apply_filters(df, selected_year, selected_month, selected_states, selected_counties)
     
  
     violation_colors = ['#D72631', '#A2D5C6', '#077B8A', '#5C3C92']
@@ -639,6 +735,9 @@ def update_violation_pie(selected_year, selected_month, selected_states, chart_t
                       "<extra></extra>"
     )
     
+    if not needs_full_figure('chart-type'):
+        return figure_patch(pie_fig, ['labels', 'values'])
+    
     return pie_fig
 
 @callback(
@@ -647,12 +746,13 @@ def update_violation_pie(selected_year, selected_month, selected_states, chart_t
      Output('total-locations', 'children')],
     [Input('year-filter', 'value'),
      Input('month-filter', 'value'),
-     Input('state-filter', 'value')]
+     Input('state-filter', 'value'),
+     Input('county-filter', 'value')]
 )
-def update_stats(selected_year, selected_month, selected_states):
+def update_stats(selected_year, selected_month, selected_states, selected_counties):
     filtered_df = df.copy()
     
-    filtered_df = apply_filters(df, selected_year, selected_month, selected_states)
+    filtered_df = apply_filters(df, selected_year, selected_month, selected_states, selected_counties)
     
     total_violations = len(filtered_df)
     total_fines = f"${filtered_df['Total_Fine'].sum():,.2f}"
@@ -661,17 +761,37 @@ def update_stats(selected_year, selected_month, selected_states):
     return f"{total_violations:,}", total_fines, f"{total_locations:,}"
 
 @callback(
-    Output('violation-map', 'figure'),
+    [Output('violation-map', 'figure'),
+     Output('violation-map-tier', 'data')],
     [Input('visualization-type', 'value'),
      Input('year-filter', 'value'),
      Input('month-filter', 'value'),
-     Input('state-filter', 'value')]
+     Input('state-filter', 'value'),
+     Input('county-filter', 'value'),
+     Input('hotspot-toggle', 'value'),
+     Input('violation-map', 'relayoutData')],
+    [State('violation-map-tier', 'data')]
 )
-def update_map(viz_type, selected_year, selected_month, selected_states):
-    filtered_df = df.copy()
-    
-    filtered_df = apply_filters(df, selected_year, selected_month, selected_states)
-    agg_data = aggregate_data(filtered_df)
+def update_map(viz_type, selected_year, selected_month, selected_states, selected_counties, show_hotspots,
+               relayout_data, current_tier):
+    if ctx.triggered_id == 'violation-map' and not is_viewport_change(relayout_data):
+        return no_update, no_update
+
+    if relayout_data and 'mapbox.zoom' in relayout_data:
+        tier = zoom_tier(relayout_data['mapbox.zoom'])
+    else:
+        tier = zoom_tier(MAP_ZOOM) if current_tier is None else current_tier
+
+    bounds = mapbox_bounds(relayout_data)
+    if bounds is None:
+        visible_df = df
+        resolution = CELL_RESOLUTION
+    else:
+        visible_df = df.iloc[SPATIAL_INDEX.bbox(*pad_bounds(bounds))]
+        resolution = min(resolution_for_bounds(bounds), CELL_RESOLUTION)
+
+    filtered_df = apply_filters(visible_df, selected_year, selected_month, selected_states, selected_counties)
+    agg_data = aggregate_data(filtered_df, resolution)
     
     
     if viz_type == 'fine':
@@ -702,11 +822,25 @@ def update_map(viz_type, selected_year, selected_month, selected_states):
         z=z_data,
         radius=20,
         opacity=0.7,
-        zoom=6.5,
+        zoom=MAP_ZOOM,
         mapbox_style="white-bg",
         color_continuous_scale=colorscale
     )
 
+    overlay = hotspot_trace(viz_type, selected_year, selected_month, show_hotspots)
+
+    # County outlines and labels never change, so only the density and hotspot traces are resent
+    if not needs_full_figure('visualization-type'):
+        patch = figure_patch(map_fig, ['lat', 'lon', 'z'], traces=[0])
+        for field in ('lat', 'lon', 'customdata', 'text'):
+            patch['data'][MAP_HOTSPOT_TRACE][field] = overlay[field]
+        patch['data'][MAP_HOTSPOT_TRACE]['marker']['color'] = overlay['marker']['color']
+        if tier != current_tier:
+            return county_ring_patch(patch, tier), tier
+        return patch, no_update
+
+    ring_arrays = iter(county_rings(tier))
+
   
     for feature in maryland_geojson["features"]:
         geometry = feature["geometry"]
@@ -715,8 +849,7 @@ def update_map(viz_type, selected_year, selected_month, selected_states):
 
         if geometry["type"] == "Polygon":
             for poly in geometry["coordinates"]:
-                lon = [coord[0] for coord in poly]
-                lat = [coord[1] for coord in poly]
+                lon, lat = next(ring_arrays)
                 map_fig.add_trace(
                     dict(
                         type="scattermapbox",
@@ -734,8 +867,7 @@ def update_map(viz_type, selected_year, selected_month, selected_states):
         elif geometry["type"] == "MultiPolygon":
             for multi_poly in geometry["coordinates"]:
                 for poly in multi_poly:
-                    lon = [coord[0] for coord in poly]
-                    lat = [coord[1] for coord in poly]
+                    lon, lat = next(ring_arrays)
                     map_fig.add_trace(
                         dict(
                             type="scattermapbox",
@@ -788,9 +920,10 @@ def update_map(viz_type, selected_year, selected_month, selected_states):
             ),
             mapbox=dict(
                 center=dict(lat=39.0458, lon=-76.6413),
-                zoom=6.5,
+                zoom=MAP_ZOOM,
                 style="white-bg"
             ),
+            uirevision='violation-map',
             margin={"r": 0, "t": 40, "l": 0, "b": 0}, 
             paper_bgcolor='white',
             plot_bgcolor='#ADD8E6'
@@ -837,8 +970,12 @@ def update_map(viz_type, selected_year, selected_month, selected_states):
         )
     
     map_fig.update_traces(
-        hovertemplate=hover_template
+        hovertemplate=hover_template,
+        selector=dict(type='densitymapbox')
     )
+    map_fig.add_trace(overlay)
 
-    return map_fig
+    # Outline vertices are the bulk of the figure, so they travel as float32 typed arrays
+    figure = encode_traces(map_fig.to_dict(), ['lon', 'lat'], coordinate_encoder(tier_decimals(tier)), COUNTY_RING_TRACES)
+    return figure, tier
 
@@ -0,0 +1,172 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import pandas as pd
+from flask import jsonify, request
+from .featurepipeline import REQUIRED_FIELDS
+from .fineprediction import predict_fine_categories
+from .modelregistry import MODEL_REGISTRY
+
+
+PREDICTION_ROUTE = '/api/fine-prediction'
+
+# A batch is scored as soon as it holds MAX_BATCH_SIZE requests or its oldest
+# request has waited MAX_WAIT_MS
+MAX_BATCH_SIZE = 64
+MAX_WAIT_MS = 10
+MAX_QUEUE_SIZE = 10000
+REQUEST_TIMEOUT_S = 30
+
+
+class MicroBatcher:
+    """Queue single predictions from many threads and score them in batches.
+
+    A background thread collects queued records until the batch is full or the
+    oldest record has waited max_wait_ms, scores the batch with one predict_batch
+    call and resolves each caller's Future with its own result. If the batch call
+    fails, its records are scored one by one so a bad record only fails its caller.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, max_queue_size=MAX_QUEUE_SIZE):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.lock = threading.Lock()
+        self.worker = None
+        self.batches = 0
+        self.rows = 0
+        self.failures = 0
+
+    def _start(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, name='fine-prediction-batcher', daemon=True)
+                self.worker.start()
+
+    def submit(self, record):
+        """Queue one record and return a Future for its result; raises queue.Full when saturated."""
+        if self.worker is None or not self.worker.is_alive():
+            self._start()
+        future = Future()
+        self.queue.put_nowait((record, future))
+        return future
+
+    def predict(self, record, timeout=REQUEST_TIMEOUT_S):
+        return self.submit(record).result(timeout)
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            records = [record for record, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                results = self.predict_batch(records)
+            except Exception:
+                results = None
+            if results is None:
+                for record, future in batch:
+                    try:
+                        future.set_result(self.predict_batch([record])[0])
+                    except Exception as error:
+                        self.failures += 1
+                        future.set_exception(error)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            self.batches += 1
+            self.rows += len(batch)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'failures': self.failures,
+            'mean_batch_size': self.rows / self.batches if self.batches else 0.0,
+            'queued': self.queue.qsize(),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms
+        }
+
+
+def prediction_records(predictions, probabilities):
+    """One JSON-ready dict per scored row."""
+    records = []
+    for (_, result), (_, row_probabilities) in zip(predictions.iterrows(), probabilities.iterrows()):
+        time_period = result['time_period']
+        records.append({
+            'predicted_category': float(result['predicted_category']),
+            'confidence': float(result['confidence']),
+            'class_probabilities': {f'{category:g}': float(p) for category, p in row_probabilities.items()},
+            'severity_risk': float(result['severity_risk']),
+            'location_cluster': int(result['location_cluster']),
+            'commercial_vehicle': bool(result['commercial_vehicle']),
+            'time_period': None if pd.isna(time_period) else str(time_period)
+        })
+    return records
+
+
+def batch_predictor(registry):
+    """predict_batch function scoring records with the registry's current model."""
+    def predict_batch(records):
+        predictions, probabilities = predict_fine_categories(pd.DataFrame(records), registry.get())
+        return prediction_records(predictions, probabilities)
+    return predict_batch
+
+
+def missing_fields(record):
+    return [field for field in REQUIRED_FIELDS if field not in record]
+
+
+def register_prediction_service(server, registry=MODEL_REGISTRY, batcher=None, route=PREDICTION_ROUTE):
+    """Add the micro-batched prediction endpoint and its stats route to a Flask server.
+
+    POST a JSON violation record, or a list of them, to the route; every record is
+    queued individually and scored together with concurrent requests. The model
+    comes from registry, by default the one the price page uses.
+    """
+    if batcher is None:
+        batcher = MicroBatcher(batch_predictor(registry))
+
+    def predict():
+        payload = request.get_json(silent=True)
+        records = payload if isinstance(payload, list) else [payload]
+        if not records or not all(isinstance(record, dict) for record in records):
+            return jsonify({'error': 'Expected a JSON object or a list of objects'}), 400
+        for i, record in enumerate(records):
+            missing = missing_fields(record)
+            if missing:
+                return jsonify({'error': f'Record {i} is missing required fields: {missing}'}), 400
+
+        try:
+            futures = [batcher.submit(record) for record in records]
+        except queue.Full:
+            return jsonify({'error': 'Prediction queue is full'}), 503
+        try:
+            results = [future.result(REQUEST_TIMEOUT_S) for future in futures]
+        except FutureTimeoutError:
+            return jsonify({'error': 'Prediction timed out'}), 504
+        except Exception as error:
+            return jsonify({'error': str(error)}), 422
+        return jsonify(results if isinstance(payload, list) else results[0])
+
+    def stats():
+        return jsonify(batcher.stats())
+
+    server.add_url_rule(route, 'fine_prediction', predict, methods=['POST'])
+    server.add_url_rule(f'{route}/stats', 'fine_prediction_stats', stats, methods=['GET'])
+    return batcher
@@ -1,18 +1,37 @@
-from dash import register_page, html, dcc, callback, Output, Input, no_update
-import joblib
+from dash import register_page, html, dcc, callback, Output, Input, no_update, ctx, Patch
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import random
+from functools import lru_cache
+from .mapviewport import mapbox_bounds, mapbox_view_bounds, pad_bounds, resolution_for_bounds
+from .spatialbinning import aggregate_cells, cell_ids
+from .featurepipeline import ROW_FEATURES
+from .featurestore import load_row_features
+from .fineprediction import explain_fine_categories, feature_pipeline, predict_fine_categories
+from .locationclusters import cluster_summaries, load_location_clusters
+from .modelregistry import MODEL_REGISTRY
 
 
 register_page(__name__, path='/price', name='price')
 
 
-model_dict = joblib.load('fine_prediction_model.joblib')
+def warm_model(model_dict):
+    global CLUSTER_DATA
+    feature_pipeline(model_dict).warm()
+    # Cluster assignments belong to the model's centroids
+    CLUSTER_DATA = None
+    cluster_layer.cache_clear()
+    base_figure.cache_clear()
+
+
+# The shared model is loaded on the first prediction, metrics or API request, and
+# reloaded when the artifact is replaced
+MODEL_REGISTRY.add_load_hook(warm_model)
 
 def get_model_metrics():
     
+    model_dict = MODEL_REGISTRY.get()
     macro_metrics = model_dict['performance']['macro avg']
     weighted_metrics = model_dict['performance']['weighted avg']
     metrics = {
@@ -51,132 +70,49 @@ def load_and_clean_data(df):
     )
     return df
 
-def predict_fine_category(input_data):
-  
-    required_fields = [
-        'Description', 'Time Of Stop', 'Latitude', 'Longitude', 'Points',
-        'Accident', 'Personal Injury', 'Property Damage', 'Fatal', 
-        'Work Zone', 'Alcohol', 'HAZMAT', 'Commercial License', 
-        'Commercial Vehicle', 'VehicleType', 'Violation Type', 
-        'Make', 'Color', 'Driver State', 'DL State', 
-        'Manufacture Year', 'SubAgency'
-    ]
-    
-    missing_fields = [field for field in required_fields if field not in input_data]
-    if missing_fields:
-        raise ValueError(f"Missing required fields: {missing_fields}")
-    
-   
-    for col in model_dict['boolean_columns']:
-        input_data[col] = convert_yes_no_to_bool(input_data[col])
-
-  
-    input_df = pd.DataFrame([input_data])
-    
-  
-    input_df['Time_Hour'] = pd.to_datetime(input_df['Time Of Stop']).dt.hour
-    input_df['Time_Period'] = pd.cut(
-        input_df['Time_Hour'],
-        bins=[0, 6, 12, 18, 24],
-        labels=['Night', 'Morning', 'Afternoon', 'Evening']
-    )
-
-   
-    location_data = input_df[['Latitude', 'Longitude']].values
-    input_df['Location_Cluster'] = model_dict['location_model'].predict(location_data)
-
-    
-    severity_columns = model_dict['boolean_columns'][:7]  
-    for col in severity_columns:
-        input_df[f'{col}_Flag'] = input_df[col].astype(int)
-
-    input_df['Severity_Score'] = input_df[[f'{col}_Flag' for col in severity_columns]].sum(axis=1)
-
-   
-    input_df['Is_Commercial'] = (
-        input_df['Commercial License'] |
-        input_df['Commercial Vehicle']
-    ).astype(int)
-
-    input_df['Is_Local'] = (
-        input_df['Driver State'] ==
-        input_df['DL State']
-    ).astype(int)
-
-   
-    for col, le in model_dict['label_encoders'].items():
-        try:
-            input_df[f'{col}_Encoded'] = le.transform(input_df[col].astype(str))
-        except ValueError:
-           
-            input_df[f'{col}_Encoded'] = le.transform([le.classes_[0]])
-
- 
-    current_year = pd.Timestamp.now().year
-    input_df['Vehicle_Age'] = current_year - pd.to_numeric(
-        input_df['Manufacture Year'], 
-        errors='coerce'
-    ).fillna(current_year)
-
-   
-    description_features = model_dict['tfidf'].transform(input_df['Description'].fillna(''))
-    description_df = pd.DataFrame(
-        description_features.toarray(),
-        columns=[f'desc_{i}' for i in range(description_features.shape[1])]
-    )
+def prediction_factors(frame, model_dict, category):
+    """Top feature contributions to the predicted category; none if the forest cannot be explained."""
+    try:
+        return explain_fine_categories(frame, model_dict, [category])[0]
+    except ValueError:
+        return []
 
-    
-    base_features = [
-        'Time_Hour',
-        'Location_Cluster',
-        'Severity_Score',
-        'Is_Commercial',
-        'Is_Local',
-        'Points',
-        'Vehicle_Age',
-        'Violation Type_Encoded',
-        'VehicleType_Encoded',
-        'SubAgency_Encoded',
-        'Make_Encoded',
-        'Color_Encoded'
-    ] + [f'{col}_Flag' for col in severity_columns]
-
-    X = pd.concat([
-        input_df[base_features],
-        description_df
-    ], axis=1)
+def predict_fine_category(input_data, stored_features=None):
+    """stored_features are the row's materialized ROW_FEATURES, used instead of re-deriving them."""
+    model_dict = MODEL_REGISTRY.get()
+    for col in model_dict['boolean_columns']:
+        if col in input_data:
+            input_data[col] = convert_yes_no_to_bool(input_data[col])
 
-  
-    X_scaled = model_dict['scaler'].transform(X.fillna(0))
-    prediction = model_dict['model'].predict(X_scaled)
-    probabilities = model_dict['model'].predict_proba(X_scaled)
-
-  
-    prob_dict = {
-        class_name: prob
-        for class_name, prob in zip(model_dict['classes'], probabilities[0])
-    }
+    frame = pd.DataFrame([{**input_data, **(stored_features or {})}])
+    predictions, probabilities = predict_fine_categories(frame, model_dict)
+    result = predictions.iloc[0]
 
     prediction_details = {
-        'predicted_category': prediction[0],
-        'confidence': np.max(probabilities),
-        'class_probabilities': prob_dict,
-        'severity_risk': input_df['Severity_Score'].iloc[0] / len(severity_columns),
+        'predicted_category': result['predicted_category'],
+        'confidence': result['confidence'],
+        'class_probabilities': probabilities.iloc[0].to_dict(),
+        'severity_risk': result['severity_risk'],
         'risk_factors': [
-            col for col in severity_columns
-            if input_df[f'{col}_Flag'].iloc[0] == 1
+            col for col in model_dict['boolean_columns'][:7]
+            if result[f'{col}_Flag'] == 1
         ],
-        'location_cluster': input_df['Location_Cluster'].iloc[0],
-        'commercial_vehicle': bool(input_df['Is_Commercial'].iloc[0]),
+        'location_cluster': result['location_cluster'],
+        'top_contributions': prediction_factors(frame, model_dict, result['predicted_category']),
+        'commercial_vehicle': bool(result['commercial_vehicle']),
         'points': input_data['Points'],
-        'time_period': input_df['Time_Period'].iloc[0]
+        'time_period': result['time_period']
     }
 
-    return prediction[0], prediction_details
+    return result['predicted_category'], prediction_details
+
+
 
+DATA_PATH = 'Maryland_Traffic_Violation_2025.csv'
 
-df = pd.read_csv('Maryland_Traffic_Violation_2025.csv')
+df = pd.read_csv(DATA_PATH)
 df = load_and_clean_data(df)
+df = df.join(load_row_features(DATA_PATH))
 
 
 
@@ -422,6 +358,7 @@ def update_prediction(n_clicks):
         return no_update, no_update, no_update, no_update
     
     
+    load_cluster_data()
     random_idx = random.randint(0, len(df) - 1)
     row = df.iloc[random_idx]
     
@@ -447,10 +384,11 @@ def update_prediction(n_clicks):
         'Driver State': row['Driver State'],
         'DL State': row['DL State'],
         'Manufacture Year': row['Manufacture Year'],
-        'SubAgency': row['SubAgency']
+        'SubAgency': row['SubAgency'],
+        'Location_Cluster': row['Location_Cluster']
     }
     
-    prediction, details = predict_fine_category(input_data)
+    prediction, details = predict_fine_category(input_data, row[ROW_FEATURES].to_dict())
     confidence = details['confidence'] * 100
     severity_risk = details['severity_risk'] * 100
     
@@ -470,6 +408,17 @@ def update_prediction(n_clicks):
         html.Tr([
             html.Td('Actual Fine', style={'padding': '5px', 'backgroundColor': '#e8f5e9', 'position': 'sticky', 'left': '0', 'fontWeight': 'bold', 'fontFamily': 'Monospace'}),
             html.Td(f"${row['Total_Fine']:.2f}", style={'padding': '5px', 'backgroundColor': '#e8f5e9', 'fontFamily': 'Monospace'})
+        ]),
+        html.Tr([
+            html.Td('Cluster Profile', style={'padding': '5px', 'backgroundColor': '#e3f2fd', 'position': 'sticky', 'left': '0', 'fontWeight': 'bold', 'fontFamily': 'Monospace'}),
+            html.Td(cluster_profile(details['location_cluster']), style={'padding': '5px', 'backgroundColor': '#e3f2fd', 'fontFamily': 'Monospace'})
+        ]),
+        html.Tr([
+            html.Td('Top Factors', style={'padding': '5px', 'backgroundColor': '#fff3e0', 'position': 'sticky', 'left': '0', 'fontWeight': 'bold', 'fontFamily': 'Monospace'}),
+            html.Td([
+                html.Div(f"{feature} {contribution:+.3f}")
+                for feature, contribution in details['top_contributions']
+            ], style={'padding': '5px', 'backgroundColor': '#fff3e0', 'fontFamily': 'Monospace'})
         ])
     ])
     
@@ -604,57 +553,101 @@ def update_prediction(n_clicks):
     return rows, gauge_figure, severity_figure, prob_figure
 
 CLUSTER_DATA = None
+CLUSTER_SUMMARIES = None
+
+MAP_CENTER = (39.3, -76.6)
+MAP_ZOOM = 6.8
+MAP_SIZE = (380, 380)
+MAP_MAX_CELLS = 120
+
+CLUSTER_COLORS = {
+    0: {'color': '#FF4136', 'name': 'Cluster 0'},
+    1: {'color': '#2ECC40', 'name': 'Cluster 1'},
+    2: {'color': '#0074D9', 'name': 'Cluster 2'},
+    3: {'color': '#FF851B', 'name': 'Cluster 3'},
+    4: {'color': '#B10DC9', 'name': 'Cluster 4'},
+}
 
 def load_cluster_data():
-    global CLUSTER_DATA
+    """Stops with coordinates and their precomputed Location_Cluster."""
+    global CLUSTER_DATA, CLUSTER_SUMMARIES
     if CLUSTER_DATA is None:
-        CLUSTER_DATA = pd.read_csv('Maryland_Traffic_Violation_Cluster.csv')
+        centers = feature_pipeline(MODEL_REGISTRY.get()).cluster_centers_
+        df['Location_Cluster'] = load_location_clusters(DATA_PATH, centers).reindex(df.index)
+        CLUSTER_SUMMARIES = cluster_summaries(df)
+        CLUSTER_DATA = df[df['Latitude'].notna() & df['Longitude'].notna()]
     return CLUSTER_DATA
 
-def generate_base_figure():
+def cluster_profile(cluster):
+    load_cluster_data()
+    summary = CLUSTER_SUMMARIES['summary']
+    if cluster not in summary.index:
+        return 'No stops'
+    stats = summary.loc[cluster]
+    return (
+        f"Cluster {cluster}: {stats['Stops']:,} stops, avg ${stats['Mean_Fine']:.2f}, "
+        f"median ${stats['Median_Fine']:.2f}, {stats['Top_Category']} {stats['Top_Category_Share']:.0%}"
+    )
+
+@lru_cache(maxsize=None)
+def cluster_layer(resolution):
+    """Bin every cluster's stops into grid cells at one resolution tier."""
     cluster_df = load_cluster_data()
-    fig = go.Figure()
-    
-    
-    cluster_colors = {
-        0: {'color': '#FF4136', 'name': 'Cluster 0'},
-        1: {'color': '#2ECC40', 'name': 'Cluster 1'},
-        2: {'color': '#0074D9', 'name': 'Cluster 2'},
-        3: {'color': '#FF851B', 'name': 'Cluster 3'},
-        4: {'color': '#B10DC9', 'name': 'Cluster 4'},
+    ids = cell_ids(cluster_df['Latitude'], cluster_df['Longitude'], resolution)
+    clusters = cluster_df['Location_Cluster'].values
+
+    layer = {
+        cluster: aggregate_cells(ids[clusters == cluster], resolution)
+        for cluster in sorted(np.unique(clusters))
+    }
+    max_count = max((cells['Count'].max() for cells in layer.values() if len(cells)), default=1)
+    for cells in layer.values():
+        cells['Marker_Size'] = 3 + 7 * np.sqrt(cells['Count'] / max_count)
+    return layer
+
+def visible_cluster_cells(bounds):
+    layer = cluster_layer(resolution_for_bounds(bounds, MAP_MAX_CELLS))
+    south, west, north, east = pad_bounds(bounds)
+    return {
+        cluster: cells[
+            cells['Latitude'].between(south, north) & cells['Longitude'].between(west, east)
+        ]
+        for cluster, cells in layer.items()
     }
+
+def cluster_hover(cluster):
+    stats = CLUSTER_SUMMARIES['summary'].loc[cluster]
+    return f"{CLUSTER_COLORS[cluster]['name']}, avg ${stats['Mean_Fine']:.0f}"
+
+def generate_base_figure():
+    bounds = mapbox_view_bounds(MAP_CENTER, MAP_ZOOM, *MAP_SIZE)
+    fig = go.Figure()
     
    
-    for cluster in sorted(cluster_df['Location_Cluster'].unique()):
-        cluster_points = cluster_df[cluster_df['Location_Cluster'] == cluster]
-        
-        fig.add_trace(go.Scattergeo(
-            lon=cluster_points['Longitude'].values,
-            lat=cluster_points['Latitude'].values,
+    for cluster, cells in visible_cluster_cells(bounds).items():
+        fig.add_trace(go.Scattermapbox(
+            lon=cells['Longitude'].values,
+            lat=cells['Latitude'].values,
             mode='markers',
             marker=dict(
-                size=4,
-                color=cluster_colors[cluster]['color'],
+                size=cells['Marker_Size'].values,
+                color=CLUSTER_COLORS[cluster]['color'],
                 opacity=0.6
             ),
-            name=cluster_colors[cluster]['name'],
-            hoverinfo='none',
+            name=CLUSTER_COLORS[cluster]['name'],
+            customdata=cells['Count'].values,
+            hovertemplate='%{customdata:,} stops<extra>' + cluster_hover(cluster) + '</extra>',
             showlegend=True
         ))
     
 
-    fig.add_trace(go.Scattergeo(
+    fig.add_trace(go.Scattermapbox(
         lon=[],
         lat=[],
         mode='markers',
         marker=dict(
-            size=8, 
-            symbol='star',
-            color='yellow',
-            line=dict(
-                width=2,
-                color='black'
-            ),
+            size=12,
+            color='black',
             opacity=1  
         ),
         name='Current Position',
@@ -662,24 +655,23 @@ def generate_base_figure():
     ))
     
     fig.update_layout(
-        geo=dict(
-            scope='usa',
-            projection_scale=15,
-            center=dict(lat=39.3, lon=-76.6),
-            showland=True,
-            landcolor='rgb(243, 243, 243)',
-            countrycolor='rgb(204, 204, 204)',
-            showsubunits=True,
-            subunitcolor='rgb(255, 255, 255)',
-            showcoastlines=True,
-            coastlinecolor='rgb(204, 204, 204)',
-            fitbounds=False,
-            visible=True,
-            uirevision='base_map'
+        title={
+            'text': 'Location Cluster Analysis',
+            'y': 0.90,
+            'x': 0.5,
+            'xanchor': 'center',
+            'yanchor': 'top',
+            'font': {'size': 14, 'family': 'Sans-Serif', 'weight':'bold', 'color':'black'}
+        },
+        mapbox=dict(
+            style='carto-positron',
+            center=dict(lat=MAP_CENTER[0], lon=MAP_CENTER[1]),
+            zoom=MAP_ZOOM
         ),
+        uirevision='base_map',
         margin=dict(l=10, r=10, t=0, b=20),
-        height=380,
-        width=380,
+        height=MAP_SIZE[1],
+        width=MAP_SIZE[0],
         showlegend=True,
         legend=dict(
             orientation="h",
@@ -698,42 +690,45 @@ def generate_base_figure():
     return fig
 
 
-BASE_FIGURE = generate_base_figure()
+@lru_cache(maxsize=None)
+def base_figure():
+    """Built on the first map request, once the model's clusters are known."""
+    return generate_base_figure()
+
+def viewport_patch(bounds):
+    patch = Patch()
+    for i, cells in enumerate(visible_cluster_cells(bounds).values()):
+        patch['data'][i]['lon'] = cells['Longitude'].tolist()
+        patch['data'][i]['lat'] = cells['Latitude'].tolist()
+        patch['data'][i]['marker']['size'] = cells['Marker_Size'].round(1).tolist()
+        patch['data'][i]['customdata'] = cells['Count'].tolist()
+    return patch
 
 @callback(
     Output('location-cluster-map', 'figure'),
-    [Input('generate-prediction-btn', 'n_clicks')]
+    [Input('generate-prediction-btn', 'n_clicks'),
+     Input('location-cluster-map', 'relayoutData')]
 )
-def update_location_cluster_map(n_clicks):
+def update_location_cluster_map(n_clicks, relayout_data):
+    if ctx.triggered_id == 'location-cluster-map':
+        bounds = mapbox_bounds(relayout_data)
+        if bounds is None:
+            return no_update
+        return viewport_patch(bounds)
+
     if n_clicks is None:
-        return BASE_FIGURE
+        return base_figure()
     
    
-    fig = go.Figure(BASE_FIGURE)
+    cluster_df = load_cluster_data() 
+    random_idx = random.randint(0, len(cluster_df) - 1)
+    row = cluster_df.iloc[random_idx]
     
-   
-    if n_clicks is not None:
-        cluster_df = load_cluster_data() 
-        random_idx = random.randint(0, len(cluster_df) - 1)
-        row = cluster_df.iloc[random_idx]
-        
-        
-        fig.data[-1].lon = [row['Longitude']]
-        fig.data[-1].lat = [row['Latitude']]
-
-
-    fig.update_layout(
-        title={
-            'text': 'Location Cluster Analysis',
-            'y': 0.90,
-            'x': 0.5,
-            'xanchor': 'center',
-            'yanchor': 'top',
-            'font': {'size': 14, 'family': 'Sans-Serif', 'weight':'bold', 'color':'black'}
-        }
-    )
-    
-    return fig
+    patch = Patch()
+    position_trace = len(base_figure().data) - 1
+    patch['data'][position_trace]['lon'] = [row['Longitude']]
+    patch['data'][position_trace]['lat'] = [row['Latitude']]
+    return patch
 
 @callback(
     Output('model-metrics-chart', 'figure'),
@@ -743,6 +738,7 @@ def update_model_metrics(_):
     """Update the model metrics chart with macro and weighted averages"""
     
 
+    model_dict = MODEL_REGISTRY.get()
     macro_metrics = model_dict['performance']['macro avg']
     weighted_metrics = model_dict['performance']['weighted avg']
     accuracy = model_dict['performance']['accuracy']
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+
+# Cells are centred on multiples of the resolution, matching np.round(coord, decimals)
+ORIGIN_LAT = -90.0
+ORIGIN_LON = -180.0
+
+
+def grid_cols(resolution):
+    return int(round(360 / resolution)) + 1
+
+
+def grid_rows_cols(lat, lon, resolution):
+    """Return integer (row, col) grid positions; missing coordinates map to -1."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    rows = np.rint((np.where(valid, lat, ORIGIN_LAT) - ORIGIN_LAT) / resolution).astype(np.int64)
+    cols = np.rint((np.where(valid, lon, ORIGIN_LON) - ORIGIN_LON) / resolution).astype(np.int64)
+    rows[~valid] = -1
+    cols[~valid] = -1
+    return rows, cols
+
+
+def cell_ids(lat, lon, resolution):
+    """Pack coordinates into int64 cell IDs; missing coordinates get -1."""
+    rows, cols = grid_rows_cols(lat, lon, resolution)
+    ids = rows * grid_cols(resolution) + cols
+    ids[rows < 0] = -1
+    return ids
+
+
+def cell_centers(ids, resolution):
+    """Decode cell IDs back to (lat, lon) cell centres."""
+    rows, cols = np.divmod(np.asarray(ids, dtype=np.int64), grid_cols(resolution))
+    lat = np.round(ORIGIN_LAT + rows * resolution, 6)
+    lon = np.round(ORIGIN_LON + cols * resolution, 6)
+    return lat, lon
+
+
+def aggregate_cells(ids, resolution, **weights):
+    """Sum weights per cell and return one row per occupied cell with its centre and Count."""
+    ids = np.asarray(ids, dtype=np.int64)
+    valid = ids >= 0
+    cells, inverse = np.unique(ids[valid], return_inverse=True)
+    lat, lon = cell_centers(cells, resolution)
+
+    data = {
+        'Cell_ID': cells,
+        'Latitude': lat,
+        'Longitude': lon,
+        'Count': np.bincount(inverse, minlength=len(cells))
+    }
+    for name, values in weights.items():
+        values = np.asarray(values, dtype=float)[valid]
+        data[name] = np.bincount(inverse, weights=values, minlength=len(cells))
+    return pd.DataFrame(data)
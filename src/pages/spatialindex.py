@@ -0,0 +1,157 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from .datacache import cached
+from .spatialbinning import cell_ids, grid_cols, grid_rows_cols
+
+
+EARTH_RADIUS_M = 6371008.8
+SPATIAL_INDEX_VERSION = 2
+
+
+def to_ecef(lat, lon):
+    """Project coordinates onto a sphere of Earth radius so chord distance tracks ground distance."""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return EARTH_RADIUS_M * np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def points_in_polygon(lat, lon, rings):
+    """Even-odd test of many points against a polygon given as GeoJSON [lon, lat] rings."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    inside = np.zeros(len(lat), dtype=bool)
+    for ring in rings:
+        ring = np.asarray(ring, dtype=float)
+        x1, y1 = ring[:, 0], ring[:, 1]
+        x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+        for ax, ay, bx, by in zip(x1, y1, x2, y2):
+            if ay == by:
+                continue
+            crosses = (ay > lat) != (by > lat)
+            x_cross = ax + (lat - ay) * (bx - ax) / (by - ay)
+            inside ^= crosses & (lon < x_cross)
+    return inside
+
+
+class GridIndex:
+    """Bucket points into a regular lat/lon grid for fast bounding-box lookups."""
+
+    def __init__(self, lat, lon, cell_size=0.01):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.cell_size = cell_size
+        self.cols = grid_cols(cell_size)
+
+        cells = cell_ids(self.lat, self.lon, cell_size)
+        positions = np.flatnonzero(cells >= 0)
+        order = np.argsort(cells[positions], kind='stable')
+        self.positions = positions[order]
+        self.cells = cells[self.positions]
+
+    def __len__(self):
+        return len(self.lat)
+
+    def bbox(self, south, west, north, east):
+        """Return row positions of points inside the bounding box."""
+        (row_start, row_end), (col_start, col_end) = grid_rows_cols(
+            [max(south, -90.0), min(north, 90.0)],
+            [max(west, -180.0), min(east, 180.0)],
+            self.cell_size
+        )
+        if len(self.cells) == 0 or row_end < row_start or col_end < col_start:
+            return np.empty(0, dtype=np.int64)
+
+        row_ids = np.arange(row_start, row_end + 1) * self.cols
+        lo = np.searchsorted(self.cells, row_ids + col_start, side='left')
+        hi = np.searchsorted(self.cells, row_ids + col_end, side='right')
+
+        lengths = hi - lo
+        total = lengths.sum()
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(lo - (np.cumsum(lengths) - lengths), lengths)
+        candidates = self.positions[np.arange(total) + offsets]
+
+        lat = self.lat[candidates]
+        lon = self.lon[candidates]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(candidates[inside])
+
+
+class SpatialIndex:
+    """Radius, k-nearest, bounding-box and polygon queries over point coordinates.
+
+    Every query returns row positions into the arrays the index was built from.
+    The k-d tree behind radius and nearest queries is built on the first such
+    query and is not pickled, so bounding-box and polygon use never pays for it.
+    """
+
+    def __init__(self, lat, lon, cell_size=0.01):
+        self.grid = GridIndex(lat, lon, cell_size)
+        self.lat = self.grid.lat
+        self.lon = self.grid.lon
+        self.valid_positions = np.flatnonzero(np.isfinite(self.lat) & np.isfinite(self.lon))
+        self._tree = None
+
+    def __getstate__(self):
+        return {**self.__dict__, '_tree': None}
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = cKDTree(to_ecef(self.lat[self.valid_positions], self.lon[self.valid_positions]))
+        return self._tree
+
+    def __len__(self):
+        return len(self.lat)
+
+    def bbox(self, south, west, north, east):
+        return self.grid.bbox(south, west, north, east)
+
+    def radius(self, lat, lon, meters):
+        """Return positions within `meters` of (lat, lon), nearest first."""
+        chord = 2 * EARTH_RADIUS_M * np.sin(min(meters / (2 * EARTH_RADIUS_M), np.pi / 2))
+        center = to_ecef([lat], [lon])[0]
+        matches = np.asarray(self.tree.query_ball_point(center, chord), dtype=np.int64)
+        if len(matches) == 0:
+            return matches
+        distances = np.linalg.norm(self.tree.data[matches] - center, axis=1)
+        return self.valid_positions[matches[np.argsort(distances, kind='stable')]]
+
+    def nearest(self, lat, lon, k=1):
+        """Return positions and ground distances in metres of the k nearest points."""
+        k = min(k, len(self.valid_positions))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        chords, matches = self.tree.query(to_ecef([lat], [lon])[0], k=k)
+        chords = np.atleast_1d(chords)
+        matches = np.atleast_1d(matches)
+        distances = 2 * EARTH_RADIUS_M * np.arcsin(np.clip(chords / (2 * EARTH_RADIUS_M), 0, 1))
+        return self.valid_positions[matches], distances
+
+    def polygon(self, rings):
+        """Return positions inside a polygon given as GeoJSON [lon, lat] rings."""
+        outer = np.asarray(rings[0], dtype=float)
+        candidates = self.bbox(outer[:, 1].min(), outer[:, 0].min(), outer[:, 1].max(), outer[:, 0].max())
+        inside = points_in_polygon(self.lat[candidates], self.lon[candidates], rings)
+        return candidates[inside]
+
+
+def load_spatial_index(lat, lon, source=None, name='spatial-index', cell_size=0.01, index_type=SpatialIndex):
+    """Build a SpatialIndex, persisting it in the data cache when the source file is known."""
+    build = lambda: index_type(lat, lon, cell_size)
+    if source is None:
+        return build()
+    return cached(
+        f'{name}-{cell_size}',
+        source,
+        build,
+        version=SPATIAL_INDEX_VERSION,
+        is_valid=lambda index: len(index) == len(lat)
+    )
+
+
+def load_grid_index(lat, lon, source=None, name='grid-index', cell_size=0.01):
+    """Build a GridIndex for pages that only make bounding-box lookups, cached like load_spatial_index."""
+    return load_spatial_index(lat, lon, source, name, cell_size, index_type=GridIndex)
@@ -4,6 +4,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 import dash_bootstrap_components as dbc
 from datetime import datetime
+from .countyassignment import load_counties
+from .featurestore import load_row_features
+from .figurepatch import figure_patch, needs_full_figure
 from .filtercomponent import create_filter_panel, apply_filters
 
 
@@ -212,6 +215,9 @@ def update_gender_distribution(violation_type, selected_year, selected_month,
         )
     )
     
+    if not needs_full_figure('violation-type-radio'):
+        return figure_patch(fig, ['x', 'y', 'text'], ['xaxis.range', 'xaxis.tickvals', 'xaxis.ticktext'])
+    
     return fig
 
 
@@ -257,6 +263,7 @@ def update_stacked_area(selected_year, selected_month, selected_states,
    
     monthly_data = accident_df.groupby(['Month_Name', 'Accident_Category']).size().reset_index(name='Count')
     pivot_data = monthly_data.pivot(index='Month_Name', columns='Accident_Category', values='Count').fillna(0)
+    pivot_data = pivot_data.reindex(columns=list(colors), fill_value=0)
     
   
     month_abbrev = {
@@ -275,16 +282,15 @@ def update_stacked_area(selected_year, selected_month, selected_states,
     
     
     for category in colors.keys():
-        if category in pivot_data.columns:
-            fig.add_trace(go.Scatter(
-                x=pivot_data.index,
-                y=pivot_data[category],
-                name=category,
-                mode='lines',
-                stackgroup='one',
-                line=dict(width=0.5),
-                fillcolor=colors[category]
-            ))
+        fig.add_trace(go.Scatter(
+            x=pivot_data.index,
+            y=pivot_data[category],
+            name=category,
+            mode='lines',
+            stackgroup='one',
+            line=dict(width=0.5),
+            fillcolor=colors[category]
+        ))
     
     fig.update_layout(
         title=dict(
@@ -317,6 +323,9 @@ def update_stacked_area(selected_year, selected_month, selected_states,
         )
     )
     
+    if not needs_full_figure():
+        return figure_patch(fig, ['y'])
+    
     return fig
 
 @callback(
@@ -438,6 +447,9 @@ def update_double_line_graph(selected_year, selected_month, selected_states,
        
     )
     
+    if not needs_full_figure('single-plot-toggle'):
+        return figure_patch(fig, ['y'])
+    
     return fig
 
 @callback(
@@ -527,6 +539,9 @@ def update_seasonal_chart(selected_year, selected_month, selected_states,
         margin=dict(l=40, r=40, t=40, b=40)  
     )
     
+    if not needs_full_figure('metric-radio'):
+        return figure_patch(fig, ['y'])
+    
     return fig
 
 @callback(
@@ -553,15 +568,22 @@ def update_gauge_charts(selected_year, selected_month, selected_states,
         filtered_df = filtered_df[filtered_df['DayOfWeek'].isin(day_filters)]
     
     
-    total_accidents = len(filtered_df[filtered_df['Accident'] == 'Yes'])
-    injury_count = len(filtered_df[filtered_df['Personal Injury'] == 'Yes'])
-    fatal_count = len(filtered_df[filtered_df['Fatal'] == 'Yes'])
+    # Counted from 'Yes' rather than the model's _Flag columns, which count a missing value as 1
+    accidents = filtered_df['Accident'] == 'Yes'
+    injuries = filtered_df['Personal Injury'] == 'Yes'
+    fatals = filtered_df['Fatal'] == 'Yes'
+    total_accidents = int(accidents.sum())
+    injury_count = int(injuries.sum())
+    fatal_count = int(fatals.sum())
+    # Severity_Score is the model feature and keeps its missing-as-1 convention
+    injury_severity = filtered_df.loc[injuries, 'Severity_Score'].mean()
+    fatal_severity = filtered_df.loc[fatals, 'Severity_Score'].mean()
     
    
     injury_percentage = (injury_count / total_accidents * 100) if total_accidents > 0 else 0
     fatal_percentage = (fatal_count / total_accidents * 100) if total_accidents > 0 else 0
 
-    def create_gauge_chart(percentage, count, title, is_injury=True):
+    def create_gauge_chart(percentage, count, title, severity, is_injury=True):
         fig = go.Figure(go.Indicator(
             mode="gauge+number",
             value=count,  
@@ -600,7 +622,7 @@ def update_gauge_charts(selected_year, selected_month, selected_states,
                     yanchor='top'
                 ),
                 dict(
-                    text=f"{percentage:.1f}% of Accidents",
+                    text=f"{percentage:.1f}% of Accidents, Sev {0 if pd.isna(severity) else severity:.1f}",
                     x=0.5,
                     y=-0.1,
                     showarrow=False,
@@ -612,8 +634,13 @@ def update_gauge_charts(selected_year, selected_month, selected_states,
         
         return fig
     
-    injury_fig = create_gauge_chart(injury_percentage, injury_count, "Personal Injury", True)
-    fatal_fig = create_gauge_chart(fatal_percentage, fatal_count, "Fatal", False)
+    injury_fig = create_gauge_chart(injury_percentage, injury_count, "Personal Injury", injury_severity, True)
+    fatal_fig = create_gauge_chart(fatal_percentage, fatal_count, "Fatal", fatal_severity, False)
+    
+    if not needs_full_figure():
+        gauge_fields = ['value', 'gauge.axis.range', 'gauge.steps']
+        return (figure_patch(injury_fig, gauge_fields, ['annotations.1.text']),
+                figure_patch(fatal_fig, gauge_fields, ['annotations.1.text']))
     
     return injury_fig, fatal_fig
 
@@ -734,12 +761,20 @@ def update_temporal_visualization(selected_year, selected_month, selected_states
              margin=dict(l=40, r=40, t=100, b=40)
         )
     
+    if not needs_full_figure('plot-type-toggle'):
+        return figure_patch(fig, ['x', 'y'])
+    
     return fig
 
 
-df = pd.read_csv("Maryland_Traffic_Violation.csv")
+DATA_PATH = "Maryland_Traffic_Violation.csv"
+
+df = pd.read_csv(DATA_PATH)
 processed_df = preprocess_data(df)
-processed_df['County'] = 'Montgomery'
+processed_df['County'] = load_counties(DATA_PATH).reindex(processed_df.index)
+processed_df = processed_df.join(
+    load_row_features(DATA_PATH, ['Severity_Score'])
+)
 
 
 layout = html.Div([
@@ -0,0 +1,70 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import scipy.sparse as sp
+
+
+class TreeExplainer:
+    """Tree-path explanations of a CompactForest's predictions, kept in a bounded LRU table.
+
+    Rows are keyed by their feature values, so a repeated input reuses its stored
+    contributions; only rows that are not in the table go through the forest, in
+    one vectorized pass. Each entry keeps just the features on the row's paths.
+    """
+
+    def __init__(self, forest, feature_names, max_size=10000):
+        self.forest = forest
+        self.feature_names = np.asarray(feature_names, dtype=object)
+        self.max_size = max_size
+        self.rows = OrderedDict()
+        # Dash callbacks explain from several threads at once
+        self.lock = threading.Lock()
+        self.bias = None
+        self.hits = 0
+        self.misses = 0
+
+    def explain(self, X):
+        """(feature indexes, (n_used, n_classes) contributions) for every row of X."""
+        X = sp.csr_matrix(X)
+        keys = [
+            (X.indices[start:end].tobytes(), X.data[start:end].tobytes())
+            for start, end in zip(X.indptr[:-1], X.indptr[1:])
+        ]
+        found, missing = {}, {}
+        with self.lock:
+            for i, key in enumerate(keys):
+                if key in found or key in missing:
+                    continue
+                entry = self.rows.get(key)
+                if entry is None:
+                    missing[key] = i
+                else:
+                    found[key] = entry
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        # The forest pass runs outside the lock so other threads keep reading the table
+        if missing:
+            missing_keys = list(missing)
+            # Chunks are reduced to the used features as they come, keeping memory bounded
+            for start, self.bias, contributions in self.forest.iter_contributions(X[list(missing.values())]):
+                for key, row in zip(missing_keys[start:start + len(contributions)], contributions):
+                    used = np.flatnonzero(np.abs(row).sum(axis=1))
+                    found[key] = (used, row[used])
+
+        with self.lock:
+            for key, entry in found.items():
+                self.rows[key] = entry
+                self.rows.move_to_end(key)
+            while len(self.rows) > self.max_size:
+                self.rows.popitem(last=False)
+        return [found[key] for key in keys]
+
+    def top_features(self, X, class_indexes, n=5):
+        """The n largest contributions to each row's class, as (feature name, contribution) pairs."""
+        top = []
+        for (used, contributions), class_index in zip(self.explain(X), class_indexes):
+            values = contributions[:, class_index]
+            order = np.argsort(-np.abs(values))[:n]
+            top.append([(self.feature_names[used[i]], float(values[i])) for i in order])
+        return top
@@ -1,9 +1,16 @@
-from dash import register_page, html, dcc, callback, Output, Input
+from dash import register_page, html, dcc, callback, Output, Input, ctx, no_update
 import pandas as pd
 import plotly.express as px
 import numpy as np
 import plotly.graph_objects as go
+from .countyassignment import load_counties
+from .featurestore import load_row_features
+from .figurepatch import figure_patch, needs_full_figure
+from .geoencoding import coordinate_encoder, encode_traces, tier_decimals, view_zoom_tier
 from .filtercomponent import create_filter_panel, apply_filters
+from .mapviewport import is_viewport_change, geo_bounds, pad_bounds, resolution_for_bounds
+from .spatialbinning import cell_centers, cell_ids
+from .spatialindex import load_grid_index
 
 register_page(__name__, path='/vehicle', name='vehicle')
 
@@ -46,9 +53,59 @@ def preprocess_data(df):
     df['Clean_Make'] = df['Make'].apply(clean_make_name)
     return df
 
-df = pd.read_csv("Maryland_Traffic_Violation.csv")
+DATA_PATH = "Maryland_Traffic_Violation.csv"
+
+df = pd.read_csv(DATA_PATH)
 processed_df = preprocess_data(df)
-processed_df['County'] = 'Montgomery'
+processed_df['County'] = load_counties(DATA_PATH).reindex(processed_df.index)
+processed_df = processed_df.join(load_row_features(DATA_PATH, ['Is_Commercial']))
+
+MANUFACTURER_COLORS = {
+    'TOYOTA': '#FF0000', 'HONDA': '#0000FF', 'NISSAN': '#808080',
+    'CHEVROLET': '#FFD700', 'FORD': '#0000A0', 'HYUNDAI': '#00FF00',
+    'LEXUS': '#800080', 'INFINITI': '#FFA500', 'MITSUBISHI': '#FF69B4',
+    'VOLVO': '#4B0082', 'DODGE': '#FF4500', 'JEEP': '#006400',
+    'SUBARU': '#8B4513', 'MERCEDES-BENZ': '#C0C0C0', 'MASERATI': '#000080',
+    'BMW': '#4169E1', 'AUDI': '#808000', 'VOLKSWAGEN': '#9400D3',
+    'KIA': '#FF1493', 'MAZDA': '#00CED1'
+}
+
+MAP_CENTER = (38.0, -95.0)
+# Markers of one map cell sit on the same point, so only the busiest makes are drawn
+MAP_TOP_MAKES = 3
+MAP_WIDTH = 300
+
+
+def build_driver_cities(df):
+    """Give each distinct driver city coordinate an integer ID; rows without coordinates get -1."""
+    coords = df[['Driver_City_Latitude', 'Driver_City_Longitude']]
+    valid = coords.notna().all(axis=1).to_numpy()
+    codes, cities = pd.MultiIndex.from_frame(coords[valid]).factorize()
+    city_ids = np.full(len(df), -1, dtype=np.int32)
+    city_ids[valid] = codes
+    return city_ids, cities.to_frame(index=False, name=list(coords.columns))
+
+
+def build_make_aggregate(df):
+    """Pre-sum stops by driver city, make, year, month, driver state and commercial flag."""
+    mapped = df[(df['Driver_City_ID'] >= 0) & df['Clean_Make'].isin(MANUFACTURER_COLORS)]
+    aggregate = mapped.groupby(
+        ['Driver_City_ID', 'Clean_Make', 'Year', 'Month', 'Driver State', 'Commercial Vehicle'],
+        dropna=False
+    ).size().reset_index(name='Stops')
+    aggregate['Clean_Make'] = aggregate['Clean_Make'].astype('category')
+    return aggregate
+
+
+processed_df['Driver_City_ID'], DRIVER_CITIES = build_driver_cities(processed_df)
+MAKE_AGGREGATE = build_make_aggregate(processed_df)
+DRIVER_CITY_INDEX = load_grid_index(
+    DRIVER_CITIES['Driver_City_Latitude'],
+    DRIVER_CITIES['Driver_City_Longitude'],
+    DATA_PATH,
+    name='driver-cities-grid',
+    cell_size=0.5
+)
 
 
 def apply_vehicle_type_filter(df, vehicle_type):
@@ -360,29 +417,41 @@ html.Div(id='year-stats-text', style={
     [Input('year-filter', 'value'),
      Input('month-filter', 'value'),
      Input('state-filter', 'value'),
-     Input('vehicle-commercial-filter', 'value')]
+     Input('vehicle-commercial-filter', 'value'),
+     Input('manufacturer-map', 'relayoutData')]
 )
-def update_vehicle_maps(selected_year, selected_month, selected_states, vehicle_type):
-    filtered_df = processed_df.copy()
-    filtered_df = apply_filters(filtered_df, selected_year, selected_month, selected_states)
-    filtered_df = apply_vehicle_type_filter(filtered_df, vehicle_type)
-    
+def update_vehicle_maps(selected_year, selected_month, selected_states, vehicle_type, relayout_data):
+    viewport_only = ctx.triggered_id == 'manufacturer-map'
+    if viewport_only and not is_viewport_change(relayout_data):
+        return no_update, no_update
 
-    stops_by_location = filtered_df.groupby(['Driver_City_Latitude', 'Driver_City_Longitude', 'Clean_Make']).size().reset_index(name='stops')
-    
-    manufacturer_colors = {
-        'TOYOTA': '#FF0000', 'HONDA': '#0000FF', 'NISSAN': '#808080',
-        'CHEVROLET': '#FFD700', 'FORD': '#0000A0', 'HYUNDAI': '#00FF00',
-        'LEXUS': '#800080', 'INFINITI': '#FFA500', 'MITSUBISHI': '#FF69B4',
-        'VOLVO': '#4B0082', 'DODGE': '#FF4500', 'JEEP': '#006400',
-        'SUBARU': '#8B4513', 'MERCEDES-BENZ': '#C0C0C0', 'MASERATI': '#000080',
-        'BMW': '#4169E1', 'AUDI': '#808000', 'VOLKSWAGEN': '#9400D3',
-        'KIA': '#FF1493', 'MAZDA': '#00CED1'
-    }
+    bounds = geo_bounds(relayout_data, MAP_CENTER, 1)
+    resolution = resolution_for_bounds(bounds, max_cells=250)
+    encode = coordinate_encoder(tier_decimals(view_zoom_tier(bounds, MAP_WIDTH)))
+    in_view = np.zeros(len(DRIVER_CITIES), dtype=bool)
+    in_view[DRIVER_CITY_INDEX.bbox(*pad_bounds(bounds))] = True
+
+    stops = apply_filters(MAKE_AGGREGATE, selected_year, selected_month, selected_states)
+    stops = apply_vehicle_type_filter(stops, vehicle_type)
+    city_ids = stops['Driver_City_ID'].to_numpy()
+    stops = stops[in_view[city_ids]]
+    city_ids = stops['Driver_City_ID'].to_numpy()
+    stops = stops.assign(Cell_ID=cell_ids(
+        DRIVER_CITIES['Driver_City_Latitude'].to_numpy()[city_ids],
+        DRIVER_CITIES['Driver_City_Longitude'].to_numpy()[city_ids],
+        resolution
+    ))
+
+    stops_by_location = stops.groupby(['Cell_ID', 'Clean_Make'], observed=True)['Stops'].sum().reset_index(name='stops')
+    stops_by_location = stops_by_location.sort_values('stops', ascending=False, kind='stable')
+    stops_by_location = stops_by_location.groupby('Cell_ID').head(MAP_TOP_MAKES)
+    stops_by_location['Driver_City_Latitude'], stops_by_location['Driver_City_Longitude'] = cell_centers(
+        stops_by_location['Cell_ID'], resolution
+    )
 
     map_fig = go.Figure()
 
-    for make in manufacturer_colors:
+    for make in MANUFACTURER_COLORS:
         make_data = stops_by_location[stops_by_location['Clean_Make'] == make]
         map_fig.add_trace(go.Scattergeo(
             lon=make_data['Driver_City_Longitude'],
@@ -392,10 +461,9 @@ def update_vehicle_maps(selected_year, selected_month, selected_states, vehicle_
             marker=dict(
                 size=6,
                 opacity=0.7,
-                color=manufacturer_colors[make]
+                color=MANUFACTURER_COLORS[make]
             ),
-            hovertemplate="<b>%{text}</b>",
-            text=[make] * len(make_data)
+            hovertemplate=f"<b>{make}</b>"
         ))
 
     map_fig.update_layout(
@@ -419,27 +487,40 @@ def update_vehicle_maps(selected_year, selected_month, selected_states, vehicle_
             countrycolor='rgb(204, 204, 204)',
             showsubunits=True,
             subunitcolor='rgb(255, 255, 255)',
-            domain=dict(x=[0, 1], y=[0, 1])
+            domain=dict(x=[0, 1], y=[0, 1]),
+            uirevision='manufacturer-map'
         ),
         margin=dict(l=0, r=0, t=30, b=0),
         height=250,
-        width=300,
+        width=MAP_WIDTH,
         autosize=False,
         paper_bgcolor='white',
         showlegend=False
     )
 
-   
+    # One trace per manufacturer is always drawn, so only the marker positions change;
+    # they travel as float32 typed arrays quantized for the current view
+    if not needs_full_figure():
+        map_fig = figure_patch(map_fig, ['lon', 'lat'], encode=encode)
+    else:
+        map_fig = encode_traces(map_fig.to_dict(), ['lon', 'lat'], encode)
+
+    if viewport_only:
+        return map_fig, no_update
+
+    filtered_df = apply_filters(processed_df, selected_year, selected_month, selected_states)
+    filtered_df = apply_vehicle_type_filter(filtered_df, vehicle_type)
+
     make_counts = filtered_df['Clean_Make'].value_counts()
     dist_fig = go.Figure()
     
     for make, count in make_counts.items():
-        if make in manufacturer_colors:
+        if make in MANUFACTURER_COLORS:
             dist_fig.add_trace(go.Bar(
                 x=[make],
                 y=[count],
                 name=make,
-                marker_color=manufacturer_colors[make]
+                marker_color=MANUFACTURER_COLORS[make]
             ))
 
     dist_fig.update_layout(
@@ -539,6 +620,9 @@ def update_top_makes(selected_year, selected_month, selected_states, vehicle_typ
         showlegend=False
     )
     
+    if not needs_full_figure():
+        return figure_patch(fig, ['values'], ['annotations'])
+    
     return fig
 
 @callback(
@@ -606,6 +690,9 @@ def update_vehicle_type(selected_year, selected_month, selected_states, vehicle_
         showlegend=False
     )
     
+    if not needs_full_figure():
+        return figure_patch(fig, ['values'], ['annotations'])
+    
     return fig
 
 @callback(
@@ -628,10 +715,13 @@ def update_commercial_license(selected_year, selected_month, selected_states, ve
         percentage = round((commercial_with_license / total_commercial * 100), 1)
     else:
         percentage = 0
+    # Commercial license or commercial vehicle, as the fine model counts it
+    commercial_share = filtered_df['Is_Commercial'].mean() * 100 if len(filtered_df) else 0
 
     return html.Div([
         html.Div(f"{percentage:.1f}%", style={'fontSize': '24px', 'fontWeight': 'bold', 'fontFamily':'Sans-Serif'}),
-        html.Div("Commercially Licensed", style={'fontSize': '20px', 'fontFamily':'Monospace', 'fontWeight': 'bold'})
+        html.Div("Commercially Licensed", style={'fontSize': '20px', 'fontFamily':'Monospace', 'fontWeight': 'bold'}),
+        html.Div(f"{commercial_share:.1f}% of stops commercial", style={'fontSize': '12px', 'fontFamily':'Monospace', 'fontWeight': 'normal'})
     ])
 
 
@@ -722,6 +812,9 @@ def update_funnel_chart(selected_year, selected_month, selected_states, vehicle_
 
     ))
     
+    if not needs_full_figure('incident-type'):
+        return figure_patch(fig, ['x'])
+    
     return fig
 
 @callback(
@@ -847,6 +940,9 @@ def update_vehicle_year_distribution(selected_year, selected_month, selected_sta
                 style={'fontSize': '18px', 'fontFamily': 'Monospace', 'wordWrap': 'break-word', 'textAlign':'center', 'marginTop':'30px', 'fontWeight': 'bold',})
     ])
     
+    if not needs_full_figure():
+        fig = figure_patch(fig, ['x', 'y'], ['yaxis.range'])
+    
     return fig, year_stats
 
 @callback(
@@ -925,6 +1021,9 @@ def update_violation_type(selected_year, selected_month, selected_states, vehicl
         )
     )
     
+    if not needs_full_figure():
+        return figure_patch(fig, ['values', 'labels', 'marker.colors'])
+    
     return fig
 
 @callback(